@@ -16,6 +16,8 @@ from .utils import (
     year_month_first,
 )
 
+_D0 = Decimal("0")
+
 
 @dataclass(frozen=True)
 class CalculationContext:
@@ -45,11 +47,11 @@ def calculate_student_allowances(
     totals_usd_by_type: Dict[AllowanceType, Decimal] = {}
     totals_cny_by_type: Dict[AllowanceType, Decimal] = {}
     for record in records:
-        totals_usd_by_type[record.allowance_type] = totals_usd_by_type.get(record.allowance_type, Decimal("0")) + record.amount.usd
-        totals_cny_by_type[record.allowance_type] = totals_cny_by_type.get(record.allowance_type, Decimal("0")) + record.amount.cny
+        totals_usd_by_type[record.allowance_type] = totals_usd_by_type.get(record.allowance_type, _D0) + record.amount.usd
+        totals_cny_by_type[record.allowance_type] = totals_cny_by_type.get(record.allowance_type, _D0) + record.amount.cny
 
-    grand_total_usd = sum(totals_usd_by_type.values(), Decimal("0"))
-    grand_total_cny = sum(totals_cny_by_type.values(), Decimal("0"))
+    grand_total_usd = sum(totals_usd_by_type.values(), _D0)
+    grand_total_cny = sum(totals_cny_by_type.values(), _D0)
 
     return CalculationResult(
         student_id=student.student_id,
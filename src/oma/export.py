@@ -1,89 +1,110 @@
 from __future__ import annotations
 
 import csv
+import itertools
 import os
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence, Tuple
+from typing import Dict, Iterable, Iterator, List, Sequence, Union
+
+# A row is either a mapping keyed by header or a sequence of values in header order.
+Row = Union[Dict[str, str], Sequence[str]]
+
+_CSV_BUFFER_SIZE = 1 << 20
+_XLSX_CHUNK_ROWS = 1000
 
 
 @dataclass(frozen=True)
 class Table:
     name: str
-    rows: List[Dict[str, str]]
+    rows: Iterable[Row]
     headers: List[str]
     column_widths: List[float] | None = None
     freeze_header: bool = True
 
 
-def write_csv(path: str, rows: Iterable[Dict[str, str]], headers: Sequence[str]) -> None:
+def write_csv(path: str, rows: Iterable[Row], headers: Sequence[str]) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(path, "w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=list(headers))
-        writer.writeheader()
+    with open(path, "w", newline="", encoding="utf-8", buffering=_CSV_BUFFER_SIZE) as handle:
+        writer = csv.writer(handle)
+        writer.writerow(headers)
+        writerow = writer.writerow
         for row in rows:
-            writer.writerow({k: row.get(k, "") for k in headers})
+            writerow(_row_values(row, headers))
 
 
 def write_excel_xlsx(path: str, tables: Sequence[Table]) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        sheets_xml, shared_strings = _build_sheets_and_shared_strings(tables)
+    shared_strings: List[str] = []
+    string_index: Dict[str, int] = {}
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf, ThreadPoolExecutor(max_workers=1) as pool:
         zf.writestr("[Content_Types].xml", _content_types_xml(len(tables)))
         zf.writestr("_rels/.rels", _root_rels_xml())
         zf.writestr("xl/workbook.xml", _workbook_xml(tables))
         zf.writestr("xl/_rels/workbook.xml.rels", _workbook_rels_xml(len(tables)))
+        for idx, table in enumerate(tables, start=1):
+            with zf.open(f"xl/worksheets/sheet{idx}.xml", "w") as handle:
+                # Deflate releases the GIL, so each chunk is compressed on the worker while
+                # the next one is serialized here. Waiting on the previous write before
+                # submitting keeps at most two chunks of XML alive at a time.
+                previous = None
+                for chunk in _iter_sheet_xml(table, shared_strings, string_index):
+                    data = chunk.encode("utf-8")
+                    if previous is not None:
+                        previous.result()
+                    previous = pool.submit(handle.write, data)
+                if previous is not None:
+                    previous.result()
         zf.writestr("xl/sharedStrings.xml", _shared_strings_xml(shared_strings))
-        for idx, sheet_xml in enumerate(sheets_xml, start=1):
-            zf.writestr(f"xl/worksheets/sheet{idx}.xml", sheet_xml)
 
 
-def _build_sheets_and_shared_strings(tables: Sequence[Table]) -> Tuple[List[str], List[str]]:
-    shared_strings: List[str] = []
-    string_index: Dict[str, int] = {}
-    sheets_xml: List[str] = []
-
-    for table in tables:
-        rows_xml = []
-        row_index = 1
-        headers = table.headers
-        rows = [dict(zip(headers, headers))] + list(table.rows)
-        cols_xml = ""
-        if table.column_widths:
-            cols_parts = []
-            for idx, width in enumerate(table.column_widths, start=1):
-                cols_parts.append(f"<col min=\"{idx}\" max=\"{idx}\" width=\"{width}\" customWidth=\"1\"/>")
-            cols_xml = f"<cols>{''.join(cols_parts)}</cols>"
-        sheet_views = ""
-        if table.freeze_header:
-            sheet_views = (
-                "<sheetViews><sheetView workbookViewId=\"0\">"
-                "<pane ySplit=\"1\" topLeftCell=\"A2\" activePane=\"bottomLeft\" state=\"frozen\"/>"
-                "</sheetView></sheetViews>"
-            )
-        for row in rows:
-            cells_xml = []
-            col_index = 1
-            for header in headers:
-                value = str(row.get(header, ""))
-                cell_ref = _cell_ref(col_index, row_index)
-                if _looks_numeric(value):
-                    cells_xml.append(f"<c r=\"{cell_ref}\" t=\"n\"><v>{value}</v></c>")
-                else:
-                    idx = _shared_string_index(value, shared_strings, string_index)
-                    cells_xml.append(f"<c r=\"{cell_ref}\" t=\"s\"><v>{idx}</v></c>")
-                col_index += 1
-            rows_xml.append(f"<row r=\"{row_index}\">{''.join(cells_xml)}</row>")
-            row_index += 1
-        sheet_xml = (
-            "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
-            "<worksheet xmlns=\"http://schemas.openxmlformats.org/spreadsheetml/2006/main\">"
-            f"{sheet_views}{cols_xml}<sheetData>{''.join(rows_xml)}</sheetData>"
-            "</worksheet>"
+def _iter_sheet_xml(table: Table, shared_strings: List[str], string_index: Dict[str, int]) -> Iterator[str]:
+    # Streams the sheet in row chunks; shared_strings is filled in as rows are consumed.
+    headers = table.headers
+    cols_xml = ""
+    if table.column_widths:
+        cols_parts = []
+        for idx, width in enumerate(table.column_widths, start=1):
+            cols_parts.append(f"<col min=\"{idx}\" max=\"{idx}\" width=\"{width}\" customWidth=\"1\"/>")
+        cols_xml = f"<cols>{''.join(cols_parts)}</cols>"
+    sheet_views = ""
+    if table.freeze_header:
+        sheet_views = (
+            "<sheetViews><sheetView workbookViewId=\"0\">"
+            "<pane ySplit=\"1\" topLeftCell=\"A2\" activePane=\"bottomLeft\" state=\"frozen\"/>"
+            "</sheetView></sheetViews>"
         )
-        sheets_xml.append(sheet_xml)
-
-    return sheets_xml, shared_strings
+    yield (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<worksheet xmlns=\"http://schemas.openxmlformats.org/spreadsheetml/2006/main\">"
+        f"{sheet_views}{cols_xml}<sheetData>"
+    )
+    rows_xml = []
+    for row_index, row in enumerate(itertools.chain([headers], table.rows), start=1):
+        cells_xml = []
+        col_index = 1
+        for value in _row_values(row, headers):
+            value = str(value)
+            cell_ref = _cell_ref(col_index, row_index)
+            if _looks_numeric(value):
+                cells_xml.append(f"<c r=\"{cell_ref}\" t=\"n\"><v>{value}</v></c>")
+            else:
+                idx = _shared_string_index(value, shared_strings, string_index)
+                cells_xml.append(f"<c r=\"{cell_ref}\" t=\"s\"><v>{idx}</v></c>")
+            col_index += 1
+        rows_xml.append(f"<row r=\"{row_index}\">{''.join(cells_xml)}</row>")
+        if len(rows_xml) >= _XLSX_CHUNK_ROWS:
+            yield "".join(rows_xml)
+            rows_xml = []
+    rows_xml.append("</sheetData></worksheet>")
+    yield "".join(rows_xml)
+
+
+def _row_values(row: Row, headers: Sequence[str]) -> Sequence[str]:
+    if isinstance(row, dict):
+        return [row.get(header, "") for header in headers]
+    return row
 
 
 def _shared_string_index(value: str, shared: List[str], lookup: Dict[str, int]) -> int:
@@ -3,6 +3,7 @@ from __future__ import annotations
 import csv
 import json
 import os
+import re
 import shutil
 from datetime import date, datetime
 from decimal import Decimal
@@ -44,7 +45,7 @@ from PySide6.QtWidgets import QHeaderView
 from PySide6.QtWidgets import QStyledItemDelegate
 
 from ..config import AllowanceConfig
-from ..models import DegreeLevel, Status, AllowanceType
+from ..models import DegreeLevel, Status
 from ..storage import db
 from ..storage.backup import create_backup, restore_backup
 from ..storage.paths import backup_dir
@@ -54,13 +55,20 @@ from .settings import load_settings, save_settings
 from .settlement import compute_monthly_settlement, parse_settlement_month
 
 
+_D0 = Decimal("0")
+# YYYY-MM-DD with "-", "/" or "." separators, as accepted by the student form and CSV import.
+_DATE_RE = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+
+
 def parse_date(value: str) -> Optional[date]:
     value = value.strip()
     if not value:
         return None
-    normalized = value.replace("/", "-").replace(".", "-")
+    match = _DATE_RE.fullmatch(value)
+    if match is None:
+        raise ValueError("invalid_date")
     try:
-        return datetime.strptime(normalized, "%Y-%m-%d").date()
+        return date(int(match[1]), int(match[2]), int(match[3]))
     except ValueError as exc:
         raise ValueError("invalid_date") from exc
 
@@ -841,8 +849,9 @@ class MainWindow(QMainWindow):
         students = db.list_students(self.conn)
         eligible = []
         cfg = db.get_latest_config(self.conn)
+        paid = db.baggage_paid_ids(self.conn)
         for s in students:
-            if s.status == Status.GRADUATED and s.graduation_date and not db.is_baggage_paid(self.conn, s.student_id):
+            if s.status == Status.GRADUATED and s.graduation_date and s.student_id not in paid:
                 eligible.append((s, "baggage"))
             if s.status == Status.WITHDRAWN and s.withdrawal_date:
                 if s.withdrawal_date.year == settlement.year and s.withdrawal_date.month == settlement.month:
@@ -856,17 +865,20 @@ class MainWindow(QMainWindow):
             self.translator.t("special.action"),
         ]
         self.special_table.setHorizontalHeaderLabels(headers)
+        withdrawn_default = bool(cfg.withdrawn_living_default)
+        labels = {
+            "baggage": (self.translator.t("special.baggage"), self.translator.t("special.baggage_toggle")),
+            "withdrawal": (self.translator.t("special.withdrawal"), self.translator.t("special.withdrawal_toggle")),
+        }
         for row, (student, typ) in enumerate(eligible):
             self.special_table.setItem(row, 0, QTableWidgetItem(student.student_id))
             self.special_table.setItem(row, 1, QTableWidgetItem(student.name))
             self.special_table.setItem(row, 2, QTableWidgetItem(self._status_label(student.status)))
-            if typ == "baggage":
-                self.special_table.setItem(row, 3, QTableWidgetItem(self.translator.t("special.baggage")))
-                checkbox = QCheckBox(self.translator.t("special.baggage_toggle"))
-            else:
-                self.special_table.setItem(row, 3, QTableWidgetItem(self.translator.t("special.withdrawal")))
-                checkbox = QCheckBox(self.translator.t("special.withdrawal_toggle"))
-                checkbox.setChecked(bool(cfg.withdrawn_living_default))
+            type_label, toggle_label = labels[typ]
+            self.special_table.setItem(row, 3, QTableWidgetItem(type_label))
+            checkbox = QCheckBox(toggle_label)
+            if typ == "withdrawal":
+                checkbox.setChecked(withdrawn_default)
             checkbox.setProperty("student_id", student.student_id)
             checkbox.setProperty("special_type", typ)
             self.special_table.setCellWidget(row, 4, checkbox)
@@ -892,7 +904,7 @@ class MainWindow(QMainWindow):
         student_map = {s.student_id: s for s in students}
         totals: Dict[str, Decimal] = {}
         for r in records:
-            totals[r.student_id] = totals.get(r.student_id, Decimal("0")) + Decimal(r.amount_cny)
+            totals[r.student_id] = totals.get(r.student_id, _D0) + Decimal(r.amount_cny)
 
         self.per_student_table.setRowCount(len(totals))
         self.per_student_table.setColumnCount(4)
@@ -963,17 +975,17 @@ class MainWindow(QMainWindow):
         config = db.config_row_to_model(cfg_row)
         students = db.list_students(self.conn)
 
-        baggage_ids = []
-        withdrawal_ids = []
+        baggage_ids = set()
+        withdrawal_ids = set()
         for row in range(self.special_table.rowCount()):
             widget = self.special_table.cellWidget(row, 4)
             if isinstance(widget, QCheckBox) and widget.isChecked():
                 sid = widget.property("student_id")
                 typ = widget.property("special_type")
                 if typ == "baggage":
-                    baggage_ids.append(sid)
+                    baggage_ids.add(sid)
                 elif typ == "withdrawal":
-                    withdrawal_ids.append(sid)
+                    withdrawal_ids.add(sid)
 
         result = compute_monthly_settlement(
             students=students,
@@ -983,12 +995,7 @@ class MainWindow(QMainWindow):
             withdrawal_living_ids=withdrawal_ids,
         )
 
-        run = db.create_run(self.conn, cfg_row.version, settlement_str, config.fx_rate_usd_to_cny)
-        if result.records:
-            db.save_records(self.conn, run.run_id, settlement_str, result.records, config.fx_rate_usd_to_cny)
-            for r in result.records:
-                if r.allowance_type == AllowanceType.BAGGAGE:
-                    db.record_baggage_paid(self.conn, r.student_id, run.run_id, settlement_str)
+        run = db.save_settlement(self.conn, cfg_row.version, settlement_str, result.records, config.fx_rate_usd_to_cny)
 
         self.run_info.setText(
             f"{self.translator.t('dashboard.run_info')}: {self.translator.t('dashboard.run_id')}={run.run_id}, "
@@ -1224,8 +1231,11 @@ class MainWindow(QMainWindow):
         records = db.fetch_records_for_run(self.conn, run.run_id)
         path = export_records(records, self.translator, fmt)
         target, _ = QFileDialog.getSaveFileName(self, "", f"settlement_{run.settlement_month}.{fmt}")
-        if target:
-            shutil.copy(path, target)
+        try:
+            if target:
+                shutil.copyfile(path, target)
+        finally:
+            Path(path).unlink(missing_ok=True)
 
     def _add_student(self) -> None:
         dialog = StudentDialog(self.translator, debug_ui=self.debug_ui)
@@ -1317,17 +1327,21 @@ class MainWindow(QMainWindow):
                     self, "", self.translator.t("error.csv_header_mismatch", expected=expected)
                 )
                 return
+            students = []
             for idx, row in enumerate(reader, start=2):
                 try:
                     if None in row and row[None]:
                         raise ValueError(self.translator.t("error.csv_header_mismatch"))
-                    student = _row_to_student(row)
-                    db.upsert_student(self.conn, student)
+                    students.append(_row_to_student(row))
                 except Exception as exc:
                     msg = str(exc)
                     if msg == "invalid_date":
                         msg = self.translator.t("error.invalid_date")
                     errors.append(f"Row {idx}: {msg}")
+        try:
+            db.upsert_students(self.conn, students)
+        except Exception as exc:
+            errors.append(str(exc))
         if errors:
             QMessageBox.warning(self, "", "\n".join(errors))
         self._load_students()
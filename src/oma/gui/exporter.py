@@ -1,60 +1,64 @@
 from __future__ import annotations
 
-import tempfile
 import json
-from datetime import datetime
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Dict, List, Sequence
+from typing import Dict, List, Sequence, Tuple
 
 from ..export import Table, write_csv, write_excel_xlsx
+from ..models import DegreeLevel
 from ..storage.db import RecordRow
 from .i18n import Translator
 
+_D0 = Decimal("0")
+_decode_json = json.JSONDecoder().decode
+
 
 def export_records(records: List[RecordRow], translator: Translator, fmt: str) -> str:
     header_keys = [
-        ("run_id", "export.header.run_id"),
-        ("settlement_month", "export.header.settlement_month"),
-        ("student_id", "export.header.student_id"),
-        ("allowance_type", "export.header.allowance_type"),
-        ("period_start", "export.header.period_start"),
-        ("period_end", "export.header.period_end"),
-        ("amount_usd", "export.header.amount_usd"),
-        ("fx_rate", "export.header.fx_rate"),
-        ("amount_cny", "export.header.amount_cny"),
-        ("rule_id", "export.header.rule_id"),
-        ("description", "export.header.description"),
-        ("metadata_json", "export.header.metadata"),
+        "export.header.run_id",
+        "export.header.settlement_month",
+        "export.header.student_id",
+        "export.header.allowance_type",
+        "export.header.period_start",
+        "export.header.period_end",
+        "export.header.amount_usd",
+        "export.header.fx_rate",
+        "export.header.amount_cny",
+        "export.header.rule_id",
+        "export.header.description",
+        "export.header.metadata",
+    ]
+    headers = [translator.tk(key) for key in header_keys]
+    # Rows are positional, in header order.
+    rows = [
+        (
+            record.run_id,
+            record.settlement_month,
+            record.student_id,
+            record.allowance_type,
+            record.period_start,
+            record.period_end,
+            record.amount_usd,
+            record.fx_rate,
+            record.amount_cny,
+            record.rule_id,
+            record.description,
+            record.metadata_json,
+        )
+        for record in records
     ]
-    headers = [translator.t(key) for _, key in header_keys]
-    rows = []
-    for record in records:
-        row_values = {
-            "run_id": record.run_id,
-            "settlement_month": record.settlement_month,
-            "student_id": record.student_id,
-            "allowance_type": record.allowance_type,
-            "period_start": record.period_start,
-            "period_end": record.period_end,
-            "amount_usd": record.amount_usd,
-            "fx_rate": record.fx_rate,
-            "amount_cny": record.amount_cny,
-            "rule_id": record.rule_id,
-            "description": record.description,
-            "metadata_json": record.metadata_json,
-        }
-        rows.append({translator.t(key): row_values[field] for field, key in header_keys})
-
-    suffix = ".xlsx" if fmt == "xlsx" else ".csv"
-    temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    temp.close()
 
+    path = _temp_path(".xlsx" if fmt == "xlsx" else ".csv")
     if fmt == "xlsx":
         tables = [Table("Settlement", rows, headers)]
-        write_excel_xlsx(temp.name, tables)
+        write_excel_xlsx(path, tables)
     else:
-        write_csv(temp.name, rows, headers)
-    return temp.name
+        write_csv(path, rows, headers)
+    return path
 
 
 def export_monthly_settlement_excel(
@@ -67,13 +71,39 @@ def export_monthly_settlement_excel(
 ) -> str:
     from ..storage.db import ConfigRow, RunRow, StudentRow
 
+    amounts = _ConfigAmounts.from_row(config_row)
     student_map = {s.student_id: s for s in students}
     records_by_student: Dict[str, List[RecordRow]] = {}
+    metas: Dict[int, Dict[str, str]] = {}
+    # Detail rows are emitted during the grouping pass. They are positional, in
+    # detail_headers order, to avoid a dict per record.
+    detail_rows: List[Tuple[str, ...]] = []
     for record in records:
-        records_by_student.setdefault(record.student_id, []).append(record)
+        metadata = metas[id(record)] = _load_metadata(record.metadata_json)
+        student = student_map.get(record.student_id)
+        student_records = records_by_student.get(record.student_id)
+        if student_records is None:
+            student_records = records_by_student[record.student_id] = []
+        student_records.append(record)
+        usd_raw = _usd_raw_for_record(record, metadata, amounts, student)
+        detail_rows.append(
+            (
+                str(record.run_id),
+                record.settlement_month,
+                record.student_id,
+                student.name if student else "",
+                record.rule_id,
+                record.description,
+                format(usd_raw, "f"),
+                record.fx_rate,
+                record.amount_cny,
+                record.period_start,
+                record.period_end,
+                record.metadata_json,
+            )
+        )
 
-    def header(key: str) -> str:
-        return translator.t(key)
+    header = translator.tk
 
     summary_headers = [
         header("export.header.settlement_month"),
@@ -96,27 +126,36 @@ def export_monthly_settlement_excel(
     summary_rows: List[Dict[str, str]] = []
     for student_id, student_records in records_by_student.items():
         student = student_map.get(student_id)
-        living_cny = sum((Decimal(r.amount_cny) for r in student_records if r.allowance_type == "Living"), Decimal("0"))
-        study_cny = sum((Decimal(r.amount_cny) for r in student_records if r.allowance_type == "Study"), Decimal("0"))
-        baggage_cny = sum((Decimal(r.amount_cny) for r in student_records if r.allowance_type == "ExcessBaggage"), Decimal("0"))
+        living_cny = sum((Decimal(r.amount_cny) for r in student_records if r.allowance_type == "Living"), _D0)
+        study_cny = sum((Decimal(r.amount_cny) for r in student_records if r.allowance_type == "Study"), _D0)
+        baggage_cny = sum((Decimal(r.amount_cny) for r in student_records if r.allowance_type == "ExcessBaggage"), _D0)
         total_cny = living_cny + study_cny + baggage_cny
-        special_flags = _special_flags(student_records, translator)
+        special_flags = _special_flags(student_records, metas, translator)
+        if student:
+            name = student.name
+            degree = student.degree_level.value
+            status = student.status.value
+            entry_iso = student.first_entry_date.isoformat()
+            graduation_iso = student.graduation_date.isoformat() if student.graduation_date else ""
+            withdrawal_iso = student.withdrawal_date.isoformat() if student.withdrawal_date else ""
+        else:
+            name = degree = status = entry_iso = graduation_iso = withdrawal_iso = ""
 
         summary_rows.append(
             {
                 header("export.header.settlement_month"): run.settlement_month,
                 header("export.header.run_id"): str(run.run_id),
                 header("export.header.student_id"): student_id,
-                header("export.header.name"): student.name if student else "",
-                header("export.header.degree_level"): student.degree_level.value if student else "",
-                header("export.header.status"): student.status.value if student else "",
-                header("export.header.entry_date"): student.first_entry_date.isoformat() if student else "",
-                header("export.header.graduation_date"): student.graduation_date.isoformat() if student and student.graduation_date else "",
-                header("export.header.withdrawal_date"): student.withdrawal_date.isoformat() if student and student.withdrawal_date else "",
-                header("export.header.living_cny"): _fmt_decimal(living_cny),
-                header("export.header.study_cny"): _fmt_decimal(study_cny),
-                header("export.header.baggage_cny"): _fmt_decimal(baggage_cny),
-                header("export.header.total_cny"): _fmt_decimal(total_cny),
+                header("export.header.name"): name,
+                header("export.header.degree_level"): degree,
+                header("export.header.status"): status,
+                header("export.header.entry_date"): entry_iso,
+                header("export.header.graduation_date"): graduation_iso,
+                header("export.header.withdrawal_date"): withdrawal_iso,
+                header("export.header.living_cny"): format(living_cny, "f"),
+                header("export.header.study_cny"): format(study_cny, "f"),
+                header("export.header.baggage_cny"): format(baggage_cny, "f"),
+                header("export.header.total_cny"): format(total_cny, "f"),
                 header("export.header.fx_rate"): run.fx_rate,
                 header("export.header.rounding_mode"): config_row.rounding_policy,
                 header("export.header.special_flags"): special_flags,
@@ -137,27 +176,6 @@ def export_monthly_settlement_excel(
         header("export.header.period_end"),
         header("export.header.metadata"),
     ]
-    detail_rows: List[Dict[str, str]] = []
-    for record in records:
-        student = student_map.get(record.student_id)
-        usd_raw = _usd_raw_for_record(record, config_row, student)
-        detail_rows.append(
-            {
-                header("export.header.run_id"): str(record.run_id),
-                header("export.header.settlement_month"): record.settlement_month,
-                header("export.header.student_id"): record.student_id,
-                header("export.header.name"): student.name if student else "",
-                header("export.header.rule_id"): record.rule_id,
-                header("export.header.description"): record.description,
-                header("export.header.usd_raw"): _fmt_decimal(usd_raw),
-                header("export.header.fx_rate"): record.fx_rate,
-                header("export.header.amount_cny"): record.amount_cny,
-                header("export.header.period_start"): record.period_start,
-                header("export.header.period_end"): record.period_end,
-                header("export.header.metadata"): record.metadata_json,
-            }
-        )
-
     student_headers = [
         header("export.header.student_id"),
         header("export.header.name"),
@@ -168,10 +186,11 @@ def export_monthly_settlement_excel(
         header("export.header.withdrawal_date"),
     ]
     student_rows = []
-    for student_id in records_by_student.keys():
-        student = student_map.get(student_id)
-        if not student:
+    for student in students:
+        if student.student_id not in records_by_student:
             continue
+        graduation_date = student.graduation_date
+        withdrawal_date = student.withdrawal_date
         student_rows.append(
             {
                 header("export.header.student_id"): student.student_id,
@@ -179,8 +198,8 @@ def export_monthly_settlement_excel(
                 header("export.header.degree_level"): student.degree_level.value,
                 header("export.header.status"): student.status.value,
                 header("export.header.entry_date"): student.first_entry_date.isoformat(),
-                header("export.header.graduation_date"): student.graduation_date.isoformat() if student.graduation_date else "",
-                header("export.header.withdrawal_date"): student.withdrawal_date.isoformat() if student.withdrawal_date else "",
+                header("export.header.graduation_date"): graduation_date.isoformat() if graduation_date else "",
+                header("export.header.withdrawal_date"): withdrawal_date.isoformat() if withdrawal_date else "",
             }
         )
 
@@ -203,7 +222,7 @@ def export_monthly_settlement_excel(
     config_rows = [
         {
             header("export.header.config_version"): str(run.config_version),
-            header("export.header.exported_at"): datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            header("export.header.exported_at"): datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
             header("export.header.living_bachelor"): config_row.living_allowance_bachelor,
             header("export.header.living_master"): config_row.living_allowance_master,
             header("export.header.living_phd"): config_row.living_allowance_phd,
@@ -226,62 +245,84 @@ def export_monthly_settlement_excel(
         Table("Config_配置快照", config_rows, config_headers, _default_widths(len(config_headers))),
     ]
 
-    suffix = ".xlsx"
-    temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    temp.close()
-    write_excel_xlsx(temp.name, tables)
-    return temp.name
+    path = _temp_path(".xlsx")
+    write_excel_xlsx(path, tables)
+    return path
+
+
+def _temp_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
 
 
 def _default_widths(count: int) -> List[float]:
     return [18.0 for _ in range(count)]
 
 
-def _fmt_decimal(value: Decimal) -> str:
-    return str(value)
+def _load_metadata(metadata_json: str) -> Dict[str, str]:
+    try:
+        return _decode_json(metadata_json)
+    except Exception:
+        return {}
 
 
-def _special_flags(records: List[RecordRow], translator: Translator) -> str:
+def _special_flags(records: List[RecordRow], metas: Dict[int, Dict[str, str]], translator: Translator) -> str:
+    baggage_label = translator.tk("export.flag.baggage")
+    withdrawal_label = translator.tk("export.flag.withdrawal")
     flags = []
+    seen_baggage = seen_withdrawal = False
     for record in records:
-        try:
-            metadata = json.loads(record.metadata_json)
-        except Exception:
-            metadata = {}
-        if record.allowance_type == "ExcessBaggage" or metadata.get("baggage_toggle") == "true":
-            if translator.t("export.flag.baggage") not in flags:
-                flags.append(translator.t("export.flag.baggage"))
-        if metadata.get("withdrawal_toggle") == "true":
-            if translator.t("export.flag.withdrawal") not in flags:
-                flags.append(translator.t("export.flag.withdrawal"))
+        metadata = metas[id(record)]
+        if not seen_baggage and (
+            record.allowance_type == "ExcessBaggage" or metadata.get("baggage_toggle") == "true"
+        ):
+            seen_baggage = True
+            flags.append(baggage_label)
+        if not seen_withdrawal and metadata.get("withdrawal_toggle") == "true":
+            seen_withdrawal = True
+            flags.append(withdrawal_label)
+        if seen_baggage and seen_withdrawal:
+            break
     return ", ".join(flags)
 
 
-def _usd_raw_for_record(record: RecordRow, config_row: "ConfigRow", student: "StudentRow") -> Decimal:
-    from ..storage.db import StudentRow, ConfigRow
+@dataclass(frozen=True)
+class _ConfigAmounts:
+    living_by_degree: Dict[DegreeLevel, Decimal]
+    study: Decimal
+    baggage: Decimal
 
-    try:
-        metadata = json.loads(record.metadata_json)
-    except Exception:
-        metadata = {}
+    @staticmethod
+    def from_row(config_row: "ConfigRow") -> "_ConfigAmounts":
+        return _ConfigAmounts(
+            living_by_degree={
+                DegreeLevel.BACHELOR: Decimal(config_row.living_allowance_bachelor),
+                DegreeLevel.MASTER: Decimal(config_row.living_allowance_master),
+                DegreeLevel.PHD: Decimal(config_row.living_allowance_phd),
+            },
+            study=Decimal(config_row.study_allowance_usd),
+            baggage=Decimal(config_row.baggage_allowance_usd),
+        )
+
+
+def _usd_raw_for_record(
+    record: RecordRow, metadata: Dict[str, str], amounts: _ConfigAmounts, student: "StudentRow"
+) -> Decimal:
+    from ..storage.db import StudentRow
 
     if record.allowance_type == "Living":
         if "monthly_usd" in metadata:
             monthly = Decimal(metadata["monthly_usd"])
         elif student is not None:
-            if student.degree_level.value == "Bachelor":
-                monthly = Decimal(config_row.living_allowance_bachelor)
-            elif student.degree_level.value == "Master":
-                monthly = Decimal(config_row.living_allowance_master)
-            else:
-                monthly = Decimal(config_row.living_allowance_phd)
+            monthly = amounts.living_by_degree[student.degree_level]
         else:
             monthly = Decimal(record.amount_usd)
         if "fraction" in metadata:
             return monthly * Decimal(metadata["fraction"])
         return monthly
     if record.allowance_type == "Study":
-        return Decimal(config_row.study_allowance_usd)
+        return amounts.study
     if record.allowance_type == "ExcessBaggage":
-        return Decimal(config_row.baggage_allowance_usd)
+        return amounts.baggage
     return Decimal(record.amount_usd)
@@ -4,6 +4,13 @@ import json
 from pathlib import Path
 from typing import Dict
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
 
 class Translator:
     def __init__(self, base_dir: Path, default_lang: str = "zh_CN") -> None:
@@ -11,22 +18,29 @@ class Translator:
         self.default_lang = default_lang
         self.lang = default_lang
         self.translations: Dict[str, Dict[str, str]] = {}
+        self._active: Dict[str, str] = {}
         self._load()
+        self._refresh_active()
 
     def _load(self) -> None:
         for code in ("zh_CN", "en_US"):
             path = self.base_dir / f"{code}.json"
-            with path.open("r", encoding="utf-8") as handle:
-                self.translations[code] = json.load(handle)
+            self.translations[code] = _loads(path.read_bytes())
+
+    def _refresh_active(self) -> None:
+        # Current language layered over the en_US fallback, so lookups are a single dict hit.
+        self._active = {**self.translations.get("en_US", {}), **self.translations.get(self.lang, {})}
 
     def set_language(self, lang: str) -> None:
         if lang in self.translations:
             self.lang = lang
+            self._refresh_active()
+
+    def tk(self, key: str) -> str:
+        return self._active.get(key, key)
 
     def t(self, key: str, **kwargs: str) -> str:
-        value = self.translations.get(self.lang, {}).get(key)
-        if value is None:
-            value = self.translations.get("en_US", {}).get(key, key)
+        value = self._active.get(key, key)
         if kwargs:
             try:
                 return value.format(**kwargs)
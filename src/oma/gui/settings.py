@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
 from typing import Dict
 
@@ -18,4 +19,6 @@ def load_settings() -> Dict[str, str]:
 
 def save_settings(data: Dict[str, str]) -> None:
     SETTINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    SETTINGS_PATH.write_text(json.dumps(data, ensure_ascii=True, indent=2), encoding="utf-8")
+    tmp_path = SETTINGS_PATH.with_suffix(".json.tmp")
+    tmp_path.write_bytes(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    os.replace(tmp_path, SETTINGS_PATH)
@@ -1,27 +1,79 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
-from decimal import Decimal
-from typing import Dict, Iterable, List, Tuple
+from types import MappingProxyType
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
 from ..calculations import CalculationContext
 from ..config import AllowanceConfig
-from ..models import AllowanceRecord, AllowanceType, Status
+from ..models import _SLOTS, AllowanceRecord, AllowanceType, DegreeLevel, MoneyAmount, Status
 from ..utils import month_end, proration_fraction
 from ..storage.db import StudentRow
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class SettlementResult:
     records: List[AllowanceRecord]
     warnings: List[str]
 
 
+@dataclass(frozen=True)
+class _SettlementAmounts:
+    """Converted amounts for one settlement run.
+
+    Full-month, study and baggage amounts are fixed per run. Prorated entry-month
+    amounts depend only on degree and entry date, so they are filled in lazily.
+    """
+
+    living_full: Dict[DegreeLevel, MoneyAmount]
+    living_full_meta: Dict[DegreeLevel, Mapping[str, str]]
+    study: MoneyAmount
+    baggage: MoneyAmount
+    # Prorated USD is rounded before conversion only under the two-step policy.
+    round_prorated_usd: bool
+    prorated: Dict[Tuple[DegreeLevel, date], Tuple[str, MoneyAmount]] = field(default_factory=dict)
+
+    @staticmethod
+    def build(ctx: CalculationContext) -> "_SettlementAmounts":
+        config = ctx.config
+        return _SettlementAmounts(
+            living_full={
+                degree: ctx.to_money(usd, round_usd=False) for degree, usd in config.living_allowance_by_degree.items()
+            },
+            # Shared read-only by every full-month living record of the degree.
+            living_full_meta={
+                degree: MappingProxyType({"monthly_usd": str(usd), "rounding_policy": config.rounding_policy})
+                for degree, usd in config.living_allowance_by_degree.items()
+            },
+            study=ctx.to_money(config.study_allowance_usd, round_usd=False),
+            baggage=ctx.to_money(config.baggage_allowance_usd, round_usd=False),
+            round_prorated_usd=config.rounding_policy == "two_step",
+        )
+
+    def prorated_living(
+        self, ctx: CalculationContext, degree: DegreeLevel, entry_date: date
+    ) -> Tuple[str, MoneyAmount]:
+        key = (degree, entry_date)
+        cached = self.prorated.get(key)
+        if cached is None:
+            fraction = proration_fraction(entry_date)
+            money = ctx.to_money(
+                ctx.config.living_allowance_by_degree[degree] * fraction,
+                round_usd=self.round_prorated_usd,
+            )
+            cached = self.prorated[key] = (str(fraction), money)
+        return cached
+
+
 def month_start(d: date) -> date:
     return date(d.year, d.month, 1)
 
 
+def month_ord(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
 def same_month(a: date, b: date) -> bool:
     return a.year == b.year and a.month == b.month
 
@@ -37,23 +89,33 @@ def compute_monthly_settlement(
     students: Iterable[StudentRow],
     settlement_month: date,
     config: AllowanceConfig,
-    baggage_pay_ids: Iterable[str],
-    withdrawal_living_ids: Iterable[str],
+    baggage_pay_ids: Union[AbstractSet[str], Iterable[str]],
+    withdrawal_living_ids: Union[AbstractSet[str], Iterable[str]],
 ) -> SettlementResult:
     ctx = CalculationContext(config=config)
+    amounts = _SettlementAmounts.build(ctx)
     records: List[AllowanceRecord] = []
     warnings: List[str] = []
-    baggage_set = set(baggage_pay_ids)
-    withdrawal_set = set(withdrawal_living_ids)
+    baggage_set = _as_id_set(baggage_pay_ids)
+    withdrawal_set = _as_id_set(withdrawal_living_ids)
+    settlement_ord = month_ord(settlement_month)
+    is_study_month = settlement_month.month == config.study_allowance_month
 
     for student in students:
+        pay_baggage = student.student_id in baggage_set
+        # Most students can be ruled out with integer month comparisons alone;
+        # only the rest go through the full rule evaluation.
+        if not (pay_baggage or _in_settlement_window(student, settlement_ord, is_study_month, config)):
+            continue
         records.extend(
             _student_records(
                 student=student,
                 settlement_month=settlement_month,
+                settlement_ord=settlement_ord,
                 config=config,
                 ctx=ctx,
-                pay_baggage=student.student_id in baggage_set,
+                amounts=amounts,
+                pay_baggage=pay_baggage,
                 pay_withdrawal_living=student.student_id in withdrawal_set,
                 warnings=warnings,
             )
@@ -62,113 +124,154 @@ def compute_monthly_settlement(
     return SettlementResult(records=records, warnings=warnings)
 
 
+def _as_id_set(ids: Union[AbstractSet[str], Iterable[str]]) -> AbstractSet[str]:
+    # Sets are used as-is; other iterables are frozen once.
+    if isinstance(ids, AbstractSet):
+        return ids
+    return frozenset(ids)
+
+
+def _in_settlement_window(
+    student: StudentRow, settlement_ord: int, is_study_month: bool, config: AllowanceConfig
+) -> bool:
+    # Conservative: may admit a student the full rules then reject, never the reverse.
+    # Study and living windows share one pass so the entry ordinal is computed once.
+    entry_ord = month_ord(student.first_entry_date)
+    if is_study_month:
+        if entry_ord == settlement_ord and config.issue_study_if_entry_month:
+            return True
+        if (
+            student.status == Status.WITHDRAWN
+            and config.issue_study_if_exit_before_oct_entry_year
+            and student.withdrawal_date is not None
+            and entry_ord // 12 == settlement_ord // 12
+        ):
+            return True
+    if settlement_ord < entry_ord:
+        return False
+    if student.status == Status.IN_STUDY:
+        return True
+    if student.status == Status.GRADUATED:
+        return student.graduation_date is not None and settlement_ord <= month_ord(student.graduation_date)
+    if student.status == Status.WITHDRAWN:
+        return student.withdrawal_date is not None and settlement_ord <= month_ord(student.withdrawal_date)
+    return False
+
+
+def _living_eligible(
+    status: Status,
+    settlement_ord: int,
+    entry_ord: int,
+    grad_ord: Optional[int],
+    wd_ord: Optional[int],
+) -> bool:
+    # Regular (non-toggle) living allowance for the settlement month.
+    if settlement_ord < entry_ord:
+        return False
+    if status == Status.IN_STUDY:
+        return True
+    if status == Status.GRADUATED and grad_ord is not None:
+        return settlement_ord <= grad_ord
+    if status == Status.WITHDRAWN and wd_ord is not None:
+        return settlement_ord < wd_ord
+    return False
+
+
 def _student_records(
     *,
     student: StudentRow,
     settlement_month: date,
+    settlement_ord: int,
     config: AllowanceConfig,
     ctx: CalculationContext,
+    amounts: _SettlementAmounts,
     pay_baggage: bool,
     pay_withdrawal_living: bool,
     warnings: List[str],
-) -> List[AllowanceRecord]:
-    items: List[AllowanceRecord] = []
-    entry_month = month_start(student.first_entry_date)
+) -> Iterator[AllowanceRecord]:
+    # Month comparisons use integer ordinals; settlement_month is the first of its month.
+    entry_ord = month_ord(student.first_entry_date)
+    grad_ord = month_ord(student.graduation_date) if student.graduation_date else None
+    wd_ord = month_ord(student.withdrawal_date) if student.withdrawal_date else None
+    if not pay_baggage:
+        # Before entry only the withdrawn exit-before-October override can still apply,
+        # and after the graduation month only an entry-month study allowance can.
+        if settlement_ord < entry_ord and not (
+            student.status == Status.WITHDRAWN and config.issue_study_if_exit_before_oct_entry_year
+        ):
+            return
+        if (
+            student.status == Status.GRADUATED
+            and grad_ord is not None
+            and settlement_ord > grad_ord
+            and settlement_ord != entry_ord
+        ):
+            return
     settlement_end = month_end(settlement_month)
-    monthly_usd = config.living_allowance_by_degree[student.degree_level]
+    monthly_usd = amounts.living_full_meta[student.degree_level]["monthly_usd"]
 
-    def add_living(prorated: bool, metadata: Dict[str, str], rule_id: str, description: str) -> None:
-        fraction = proration_fraction(student.first_entry_date) if prorated else Decimal("1")
-        usd = monthly_usd * fraction
+    def living(prorated: bool, metadata: Mapping[str, str], rule_id: str, description: str) -> AllowanceRecord:
         if prorated:
-            metadata = {**metadata, "fraction": str(fraction)}
-        round_usd = prorated and config.rounding_policy == "two_step"
-        money = ctx.to_money(usd, round_usd=round_usd)
-        items.append(
-            AllowanceRecord(
-                student_id=student.student_id,
-                allowance_type=AllowanceType.LIVING,
-                period_start=settlement_month,
-                period_end=settlement_end,
-                amount=money,
-                rule_id=rule_id,
-                description=description,
-                metadata={**metadata, "rounding_policy": config.rounding_policy},
-            )
+            fraction, money = amounts.prorated_living(ctx, student.degree_level, student.first_entry_date)
+            metadata = {**metadata, "fraction": fraction, "rounding_policy": config.rounding_policy}
+        else:
+            money = amounts.living_full[student.degree_level]
+            if "rounding_policy" not in metadata:
+                metadata = {**metadata, "rounding_policy": config.rounding_policy}
+        return AllowanceRecord(
+            student_id=student.student_id,
+            allowance_type=AllowanceType.LIVING,
+            period_start=settlement_month,
+            period_end=settlement_end,
+            amount=money,
+            rule_id=rule_id,
+            description=description,
+            metadata=metadata,
         )
 
     # Living allowance
-    if settlement_month >= entry_month:
-        if student.status == Status.IN_STUDY:
-            if same_month(settlement_month, entry_month):
-                add_living(
-                    True,
-                    {"monthly_usd": str(monthly_usd), "entry_date": student.first_entry_date.isoformat()},
-                    "LIVING_ENTRY_PRORATE",
-                    "Prorated living allowance for entry month",
-                )
-            else:
-                add_living(
-                    False,
-                    {"monthly_usd": str(monthly_usd)},
-                    "LIVING_FULL_MONTH",
-                    "Full monthly living allowance",
-                )
-        elif student.status == Status.GRADUATED and student.graduation_date:
-            grad_month = month_start(student.graduation_date)
-            if settlement_month <= grad_month:
-                if same_month(settlement_month, entry_month):
-                    add_living(
-                        True,
-                        {"monthly_usd": str(monthly_usd), "entry_date": student.first_entry_date.isoformat()},
-                        "LIVING_ENTRY_PRORATE",
-                        "Prorated living allowance for entry month",
-                    )
-                else:
-                    add_living(
-                        False,
-                        {"monthly_usd": str(monthly_usd)},
-                        "LIVING_FULL_MONTH",
-                        "Full monthly living allowance",
-                    )
-        elif student.status == Status.WITHDRAWN and student.withdrawal_date:
-            withdrawal_month = month_start(student.withdrawal_date)
-            if settlement_month < withdrawal_month:
-                if same_month(settlement_month, entry_month):
-                    add_living(
-                        True,
-                        {"monthly_usd": str(monthly_usd), "entry_date": student.first_entry_date.isoformat()},
-                        "LIVING_ENTRY_PRORATE",
-                        "Prorated living allowance for entry month",
-                    )
-                else:
-                    add_living(
-                        False,
-                        {"monthly_usd": str(monthly_usd)},
-                        "LIVING_FULL_MONTH",
-                        "Full monthly living allowance",
-                    )
-            elif settlement_month == withdrawal_month and pay_withdrawal_living:
-                metadata = {"monthly_usd": str(monthly_usd), "withdrawal_toggle": "true"}
-                if same_month(settlement_month, entry_month):
-                    metadata["entry_date"] = student.first_entry_date.isoformat()
-                    add_living(
-                        True,
-                        metadata,
-                        "LIVING_WITHDRAWAL_TOGGLE_PRORATE",
-                        "Prorated living allowance for withdrawal month (toggle)",
-                    )
-                else:
-                    add_living(
-                        False,
-                        metadata,
-                        "LIVING_WITHDRAWAL_TOGGLE",
-                        "Living allowance for withdrawal month (toggle)",
-                    )
+    if _living_eligible(student.status, settlement_ord, entry_ord, grad_ord, wd_ord):
+        if settlement_ord == entry_ord:
+            yield living(
+                True,
+                {"monthly_usd": monthly_usd, "entry_date": student.first_entry_date.isoformat()},
+                "LIVING_ENTRY_PRORATE",
+                "Prorated living allowance for entry month",
+            )
+        else:
+            yield living(
+                False,
+                amounts.living_full_meta[student.degree_level],
+                "LIVING_FULL_MONTH",
+                "Full monthly living allowance",
+            )
+    elif (
+        pay_withdrawal_living
+        and student.status == Status.WITHDRAWN
+        and wd_ord is not None
+        and settlement_ord >= entry_ord
+        and settlement_ord == wd_ord
+    ):
+        metadata = {"monthly_usd": monthly_usd, "withdrawal_toggle": "true"}
+        if settlement_ord == entry_ord:
+            metadata["entry_date"] = student.first_entry_date.isoformat()
+            yield living(
+                True,
+                metadata,
+                "LIVING_WITHDRAWAL_TOGGLE_PRORATE",
+                "Prorated living allowance for withdrawal month (toggle)",
+            )
+        else:
+            yield living(
+                False,
+                metadata,
+                "LIVING_WITHDRAWAL_TOGGLE",
+                "Living allowance for withdrawal month (toggle)",
+            )
 
     # Study allowance
     if settlement_month.month == config.study_allowance_month:
-        target_first = date(settlement_month.year, config.study_allowance_month, 1)
+        target_first = settlement_month
         qualifies_month = False
         entry_month_override = False
         special_case = False
@@ -182,11 +285,7 @@ def _student_records(
                 and student.withdrawal_date < target_first
                 and config.issue_study_if_exit_before_oct_entry_year
             )
-        if (
-            config.issue_study_if_entry_month
-            and student.first_entry_date.year == settlement_month.year
-            and student.first_entry_date.month == settlement_month.month
-        ):
+        if config.issue_study_if_entry_month and entry_ord == settlement_ord:
             entry_month_override = True
         if qualifies_month or entry_month_override or special_case:
             if special_case:
@@ -198,25 +297,23 @@ def _student_records(
             else:
                 rule_id = "STUDY_MONTH_IN_STUDY"
                 description = "Study allowance issued for study month in-study"
-            money = ctx.to_money(config.study_allowance_usd, round_usd=False)
-            items.append(
-                AllowanceRecord(
-                    student_id=student.student_id,
-                    allowance_type=AllowanceType.STUDY,
-                    period_start=target_first,
-                    period_end=target_first,
-                    amount=money,
-                    rule_id=rule_id,
-                    description=description,
-                    metadata={
-                        "year": str(settlement_month.year),
-                        "study_month": str(config.study_allowance_month),
-                        "qualifies_month": str(qualifies_month),
-                        "entry_month_override": str(entry_month_override),
-                        "special_case": str(special_case),
-                        "rounding_policy": config.rounding_policy,
-                    },
-                )
+            money = amounts.study
+            yield AllowanceRecord(
+                student_id=student.student_id,
+                allowance_type=AllowanceType.STUDY,
+                period_start=target_first,
+                period_end=target_first,
+                amount=money,
+                rule_id=rule_id,
+                description=description,
+                metadata={
+                    "year": str(settlement_month.year),
+                    "study_month": str(config.study_allowance_month),
+                    "qualifies_month": str(qualifies_month),
+                    "entry_month_override": str(entry_month_override),
+                    "special_case": str(special_case),
+                    "rounding_policy": config.rounding_policy,
+                },
             )
 
     # Baggage allowance
@@ -224,25 +321,21 @@ def _student_records(
         if not student.graduation_date:
             warnings.append(f"{student.student_id}: missing graduation_date")
         else:
-            if settlement_month < month_start(student.graduation_date):
+            if settlement_ord < grad_ord:
                 warnings.append(f"{student.student_id}: before graduation month")
             else:
-                money = ctx.to_money(config.baggage_allowance_usd, round_usd=False)
-                items.append(
-                    AllowanceRecord(
-                        student_id=student.student_id,
-                        allowance_type=AllowanceType.BAGGAGE,
-                        period_start=student.graduation_date,
-                        period_end=student.graduation_date,
-                        amount=money,
-                        rule_id="BAGGAGE_ON_GRADUATION",
-                        description="One-time excess baggage allowance after graduation",
-                        metadata={
-                            "baggage_toggle": "true",
-                            "settlement_month": settlement_month.isoformat(),
-                            "rounding_policy": config.rounding_policy,
-                        },
-                    )
+                money = amounts.baggage
+                yield AllowanceRecord(
+                    student_id=student.student_id,
+                    allowance_type=AllowanceType.BAGGAGE,
+                    period_start=student.graduation_date,
+                    period_end=student.graduation_date,
+                    amount=money,
+                    rule_id="BAGGAGE_ON_GRADUATION",
+                    description="One-time excess baggage allowance after graduation",
+                    metadata={
+                        "baggage_toggle": "true",
+                        "settlement_month": settlement_month.isoformat(),
+                        "rounding_policy": config.rounding_policy,
+                    },
                 )
-
-    return items
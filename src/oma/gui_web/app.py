@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import json
-from dataclasses import asdict
-from datetime import date, datetime
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import is_dataclass
+from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
+from enum import Enum
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Set, Tuple
 
 from PySide6.QtCore import QObject, QUrl, Slot
 from PySide6.QtWidgets import QFileDialog
@@ -22,134 +26,197 @@ from ..gui.i18n import Translator
 from ..gui.settings import load_settings, save_settings
 from ..gui.settlement import compute_monthly_settlement, parse_settlement_month, same_month
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+_D0 = Decimal("0")
+_CENTS = Decimal("0.01")
+# YYYY-MM-DD with "-", "/" or "." separators, as accepted by the student form and CSV import.
+_DATE_RE = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+# Enum.value goes through a descriptor; a dict hit is several times cheaper per student.
+_ENUM_VALUES: Dict[Enum, str] = {member: member.value for enum in (DegreeLevel, Status) for member in enum}
+
+
+def _json_default(obj):
+    # orjson walks the storage row dataclasses natively; the stdlib fallback needs their fields.
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if is_dataclass(obj):
+        return vars(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj) -> str:
+    # Slot results go straight to JSON.parse in the page, so whitespace is irrelevant.
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, default=_json_default)
 
 
 def parse_date(value: str) -> date | None:
     value = value.strip()
     if not value:
         return None
-    normalized = value.replace("/", "-").replace(".", "-")
-    return datetime.strptime(normalized, "%Y-%m-%d").date()
+    match = _DATE_RE.fullmatch(value)
+    if match is None:
+        raise ValueError(f"invalid date: {value!r}")
+    return date(int(match[1]), int(match[2]), int(match[3]))
 
 
 class Backend(QObject):
-    def __init__(self, translator: Translator, conn) -> None:
+    def __init__(self, translator: Translator, conn, settings: Dict[str, str]) -> None:
         super().__init__()
         self.translator = translator
         self.conn = conn
-
-    def _lang(self) -> str:
-        return self.translator.lang
+        # Loaded once by WebApp; slots mutate it in place and write it through with save_settings.
+        self.settings = settings
+        self._language = translator.lang
+        # Translation files are loaded once, so the encoded table per language never changes.
+        self._translations_json: Dict[str, str] = {}
+        self._valid_months: Set[str] = set()
+        # Bumped by every slot that writes to the database; keys the cached get_state payload.
+        self._state_version = 0
+        self._state_cache: Tuple[Tuple[int, str, str], str] | None = None
+        # Only student writes bump this; a settlement run leaves the student fragments reusable.
+        self._students_version = 0
+        self._students_cache: Tuple[int, List[db.StudentRow], str, str] | None = None
 
     @Slot(result=str)
     def get_state(self) -> str:
-        settings = load_settings()
-        settlement_month = settings.get("settlement_month") or date.today().strftime("%Y-%m")
+        settlement_month = self.settings.get("settlement_month") or date.today().strftime("%Y-%m")
+        key = (self._state_version, self._language, settlement_month)
+        if self._state_cache is not None and self._state_cache[0] == key:
+            return self._state_cache[1]
         cfg = db.get_latest_config(self.conn)
-        students = db.list_students(self.conn)
-        counts = db.student_counts(self.conn)
+        students, students_json, counts_json = self._students_snapshot()
         run = db.get_latest_run_for_month(self.conn, settlement_month)
-        special = self._special_list(settlement_month)
+        special = self._special_list(settlement_month, students=students, cfg=cfg)
         records = db.fetch_records_for_run(self.conn, run.run_id) if run else []
         per_student = self._per_student_totals(records, students)
-        return json.dumps(
+        rest = _dumps(
             {
-                "config": asdict(cfg),
-                "run": asdict(run) if run else None,
-                "students": [self._student_to_dict(s) for s in students],
-                "counts": counts,
+                "config": cfg,
+                "run": run,
                 "settlement_month": settlement_month,
                 "special": special,
-                "language": self._lang(),
-                "records": [r.__dict__ for r in records],
+                "language": self._language,
+                "records": records,
                 "per_student": per_student,
-                "runs": [asdict(r) for r in db.list_runs(self.conn)],
+                "runs": db.list_runs(self.conn),
             },
-            ensure_ascii=False,
         )
+        payload = f'{{"students":{students_json},"counts":{counts_json},{rest[1:]}'
+        self._state_cache = (key, payload)
+        return payload
+
+    @Slot(result=str)
+    def get_students_section(self) -> str:
+        # The part of get_state that a student add/edit/delete/import can change.
+        settlement_month = self.settings.get("settlement_month") or date.today().strftime("%Y-%m")
+        students, students_json, counts_json = self._students_snapshot()
+        special = _dumps(self._special_list(settlement_month, students=students))
+        return f'{{"students":{students_json},"counts":{counts_json},"special":{special}}}'
 
     @Slot(str, result=str)
     def set_language(self, lang: str) -> str:
         self.translator.set_language(lang)
-        settings = load_settings()
-        settings["language"] = lang
-        save_settings(settings)
-        return json.dumps({"ok": True})
+        self._language = self.translator.lang
+        self.settings["language"] = lang
+        save_settings(self.settings)
+        return _dumps({"ok": True})
 
     @Slot(str, result=str)
     def set_settlement_month(self, value: str) -> str:
         if value:
-            settings = load_settings()
-            settings["settlement_month"] = value
-            save_settings(settings)
-        return json.dumps({"ok": True})
+            self.settings["settlement_month"] = value
+            save_settings(self.settings)
+        return _dumps({"ok": True})
 
     @Slot(result=str)
     def get_translations(self) -> str:
-        return json.dumps(self.translator.translations.get(self._lang(), {}), ensure_ascii=False)
+        lang = self._language
+        cached = self._translations_json.get(lang)
+        if cached is None:
+            cached = self._translations_json[lang] = _dumps(self.translator.translations.get(lang, {}))
+        return cached
 
     @Slot(str, result=str)
     def list_students(self, query: str) -> str:
         students = db.list_students(self.conn, query=query)
-        return json.dumps([asdict(s) for s in students], ensure_ascii=False)
+        return _dumps([self._student_to_dict(s) for s in students])
 
     @Slot(str, result=str)
     def save_student(self, payload: str) -> str:
         data = json.loads(payload)
         student, errors, warnings = self._validate_student(data)
         if errors:
-            return json.dumps({"ok": False, "errors": errors}, ensure_ascii=False)
+            return _dumps({"ok": False, "errors": errors})
         if student is None:
-            return json.dumps({"ok": False, "errors": [self.translator.t("error.required")]})
+            return _dumps({"ok": False, "errors": [self.translator.t("error.required")]})
         db.upsert_student(self.conn, student)
-        return json.dumps({"ok": True, "warnings": warnings}, ensure_ascii=False)
+        self._data_changed(students=True)
+        return _dumps({"ok": True, "warnings": warnings})
 
     @Slot(str, result=str)
     def delete_student(self, student_id: str) -> str:
         db.delete_student(self.conn, student_id)
-        return json.dumps({"ok": True})
+        self._data_changed(students=True)
+        return _dumps({"ok": True})
 
     @Slot(str, result=str)
     def import_students(self, csv_text: str) -> str:
         import csv
         import io
 
-        reader = csv.DictReader(io.StringIO(csv_text))
-        if not reader.fieldnames:
-            return json.dumps(
+        reader = csv.reader(io.StringIO(csv_text))
+        fieldnames = next(reader, None)
+        if not fieldnames:
+            return _dumps(
                 {"ok": False, "errors": [self.translator.t("error.csv_header_mismatch")]},
-                ensure_ascii=False,
             )
-        fieldnames = list(reader.fieldnames)
-        if fieldnames and fieldnames[0].startswith("\ufeff"):
+        if fieldnames[0].startswith("\ufeff"):
             fieldnames[0] = fieldnames[0].lstrip("\ufeff")
         if fieldnames != STUDENT_CSV_HEADERS:
             expected = ", ".join(STUDENT_CSV_HEADERS)
-            return json.dumps(
+            return _dumps(
                 {"ok": False, "errors": [self.translator.t("error.csv_header_mismatch", expected=expected)]},
-                ensure_ascii=False,
             )
+        width = len(fieldnames)
+        t = self.translator.t
         errors = []
         warnings = []
-        for idx, row in enumerate(reader, start=2):
-            try:
-                if None in row and row[None]:
-                    errors.append(f"Row {idx}: {self.translator.t('error.csv_header_mismatch')}")
-                    continue
-                student, row_errors, row_warnings = self._validate_student(row)
-                if row_errors:
-                    for err in row_errors:
-                        errors.append(f"Row {idx}: {err}")
-                    continue
-                if student is None:
-                    errors.append(f"Row {idx}: {self.translator.t('error.required')}")
+
+        def valid_students():
+            # Validated rows are streamed straight into the upsert; rejected rows only leave messages.
+            # Blank lines are skipped without consuming a row number, as DictReader did.
+            for idx, row in enumerate((row for row in reader if row), start=2):
+                try:
+                    if len(row) > width:
+                        errors.append(f"Row {idx}: {t('error.csv_header_mismatch')}")
+                        continue
+                    student, row_errors, row_warnings = self._validate_student(dict(zip(fieldnames, row)))
+                    if row_errors:
+                        for err in row_errors:
+                            errors.append(f"Row {idx}: {err}")
+                        continue
+                    if student is None:
+                        errors.append(f"Row {idx}: {t('error.required')}")
+                        continue
+                    warnings.extend([f"Row {idx}: {w}" for w in row_warnings])
+                except Exception as exc:
+                    errors.append(f"Row {idx}: {exc}")
                     continue
-                db.upsert_student(self.conn, student)
-                warnings.extend([f"Row {idx}: {w}" for w in row_warnings])
-            except Exception as exc:
-                errors.append(f"Row {idx}: {exc}")
-        return json.dumps({"ok": len(errors) == 0, "errors": errors, "warnings": warnings}, ensure_ascii=False)
+                yield student
+
+        try:
+            db.upsert_students(self.conn, valid_students())
+        except Exception as exc:
+            errors.append(str(exc))
+        self._data_changed(students=True)
+        return _dumps({"ok": len(errors) == 0, "errors": errors, "warnings": warnings})
 
     @Slot(result=str)
     def get_csv_template(self) -> str:
@@ -157,7 +224,7 @@ class Backend(QObject):
 
     @Slot(result=str)
     def export_csv_template(self) -> str:
-        settings = load_settings()
+        settings = self.settings
         export_dir = self._export_dir(settings, key="csv_dir")
         caption = self.translator.t("dialog.save_csv")
         filter_text = self.translator.t("dialog.filter.csv")
@@ -165,16 +232,16 @@ class Backend(QObject):
             None, caption, str(export_dir / "students_template.csv"), filter_text
         )
         if not target:
-            return json.dumps({"ok": True, "cancelled": True})
+            return _dumps({"ok": True, "cancelled": True})
         if not target.lower().endswith(".csv"):
             target = f"{target}.csv"
         try:
             Path(target).write_text(self.get_csv_template() + "\n", encoding="utf-8")
         except Exception:
-            return json.dumps({"ok": False, "error": "save_failed"}, ensure_ascii=False)
+            return _dumps({"ok": False, "error": "save_failed"})
         settings["csv_dir"] = str(Path(target).parent)
         save_settings(settings)
-        return json.dumps({"ok": True})
+        return _dumps({"ok": True})
 
     @Slot(str, result=str)
     def save_config(self, payload: str) -> str:
@@ -197,7 +264,8 @@ class Backend(QObject):
             rounding_policy=data.get("rounding_policy", "final_only"),
         )
         db.save_config(self.conn, config, withdrawn_living_default=data["withdrawn_default"])
-        return json.dumps({"ok": True})
+        self._data_changed()
+        return _dumps({"ok": True})
 
     @Slot(str, str, str, result=str)
     def run_settlement(self, settlement_month: str, baggage_ids: str, withdrawal_ids: str) -> str:
@@ -206,8 +274,8 @@ class Backend(QObject):
         students = db.list_students(self.conn)
         safe_month = self._normalize_month(settlement_month)
         settlement_date = parse_settlement_month(safe_month)
-        baggage = set([s for s in baggage_ids.split(",") if s])
-        withdrawal = set([s for s in withdrawal_ids.split(",") if s])
+        baggage = frozenset(s for s in baggage_ids.split(",") if s)
+        withdrawal = frozenset(s for s in withdrawal_ids.split(",") if s)
 
         result = compute_monthly_settlement(
             students=students,
@@ -216,38 +284,39 @@ class Backend(QObject):
             baggage_pay_ids=baggage,
             withdrawal_living_ids=withdrawal,
         )
-        run = db.create_run(self.conn, cfg_row.version, safe_month, config.fx_rate_usd_to_cny)
-        if result.records:
-            db.save_records(self.conn, run.run_id, safe_month, result.records, config.fx_rate_usd_to_cny)
-            for r in result.records:
-                if r.allowance_type.value == "ExcessBaggage":
-                    db.record_baggage_paid(self.conn, r.student_id, run.run_id, safe_month)
-        return json.dumps({"ok": True, "run_id": run.run_id, "warnings": result.warnings}, ensure_ascii=False)
+        run = db.save_settlement(self.conn, cfg_row.version, safe_month, result.records, config.fx_rate_usd_to_cny)
+        self._data_changed()
+        return _dumps({"ok": True, "run_id": run.run_id, "warnings": result.warnings})
 
     @Slot(str, result=str)
     def get_reports(self, settlement_month: str) -> str:
         run = db.get_latest_run_for_month(self.conn, settlement_month)
         if not run:
-            return json.dumps({"ok": False, "error": "no_run"})
+            return _dumps({"ok": False, "error": "no_run"})
         records = db.fetch_records_for_run(self.conn, run.run_id)
         students = db.list_students(self.conn)
         per_student = self._per_student_totals(records, students)
-        return json.dumps(
-            {"ok": True, "run": asdict(run), "records": [r.__dict__ for r in records], "per_student": per_student},
-            ensure_ascii=False,
+        return _dumps(
+            {"ok": True, "run": run, "records": records, "per_student": per_student},
         )
 
     @Slot(str, str, result=str)
     def export_settlement(self, settlement_month: str, fmt: str) -> str:
         run = db.get_latest_run_for_month(self.conn, self._normalize_month(settlement_month))
         if not run:
-            return json.dumps({"ok": False})
+            return _dumps({"ok": False})
         records = db.fetch_records_for_run(self.conn, run.run_id)
-        temp_path = export_records(records, self.translator, fmt)
-        target, _ = QFileDialog.getSaveFileName(None, "", f"settlement_{settlement_month}.{fmt}")
-        if target:
-            Path(target).write_bytes(Path(temp_path).read_bytes())
-        return json.dumps({"ok": True})
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # Build the file while the save dialog is open; only the main thread touches SQLite.
+            pending = pool.submit(export_records, records, self.translator, fmt)
+            target, _ = QFileDialog.getSaveFileName(None, "", f"settlement_{settlement_month}.{fmt}")
+            temp_path = pending.result()
+        try:
+            if target:
+                shutil.copyfile(temp_path, target)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+        return _dumps({"ok": True})
 
     @Slot(str, str, result=str)
     def export_settlement_excel(self, settlement_month: str, run_id: str) -> str:
@@ -260,81 +329,118 @@ class Backend(QObject):
         if run is None:
             run = db.get_latest_run_for_month(self.conn, self._normalize_month(settlement_month))
         if not run:
-            return json.dumps({"ok": False, "error": "no_run"})
+            return _dumps({"ok": False, "error": "no_run"})
         records = db.fetch_records_for_run(self.conn, run.run_id)
         students = db.list_students(self.conn)
         config_row = db.get_config_by_version(self.conn, run.config_version)
-        temp_path = export_monthly_settlement_excel(
-            run=run,
-            config_row=config_row,
-            students=students,
-            records=records,
-            translator=self.translator,
-        )
         filename = f"OmanSettlement_{run.settlement_month}_{run.run_id}.xlsx"
-        settings = load_settings()
+        settings = self.settings
         export_dir = self._export_dir(settings, key="export_dir")
         default_path = export_dir / filename
         caption = self.translator.t("dialog.save_excel")
         filter_text = self.translator.t("dialog.filter.xlsx")
-        target, _ = QFileDialog.getSaveFileName(None, caption, str(default_path), filter_text)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # Build the workbook while the save dialog is open; only the main thread touches SQLite.
+            pending = pool.submit(
+                export_monthly_settlement_excel,
+                run=run,
+                config_row=config_row,
+                students=students,
+                records=records,
+                translator=self.translator,
+            )
+            target, _ = QFileDialog.getSaveFileName(None, caption, str(default_path), filter_text)
+            temp_path = pending.result()
         if not target:
-            return json.dumps({"ok": True, "cancelled": True})
+            Path(temp_path).unlink(missing_ok=True)
+            return _dumps({"ok": True, "cancelled": True})
         if not target.lower().endswith(".xlsx"):
             target = f"{target}.xlsx"
         try:
-            Path(target).write_bytes(Path(temp_path).read_bytes())
+            shutil.copyfile(temp_path, target)
         except Exception:
-            return json.dumps({"ok": False, "error": "save_failed"}, ensure_ascii=False)
+            return _dumps({"ok": False, "error": "save_failed"})
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
         settings["export_dir"] = str(Path(target).parent)
         save_settings(settings)
-        return json.dumps({"ok": True})
+        return _dumps({"ok": True})
 
     @Slot(str, result=str)
     def delete_run(self, run_id: str) -> str:
         try:
             db.delete_run(self.conn, int(run_id))
         except Exception:
-            return json.dumps({"ok": False}, ensure_ascii=False)
-        return json.dumps({"ok": True})
+            return _dumps({"ok": False})
+        self._data_changed()
+        return _dumps({"ok": True})
 
     @Slot(str, result=str)
     def get_special(self, settlement_month: str) -> str:
         safe_month = self._normalize_month(settlement_month)
-        return json.dumps({"ok": True, "special": self._special_list(safe_month)}, ensure_ascii=False)
+        return _dumps({"ok": True, "special": self._special_list(safe_month)})
 
     @Slot(str, result=str)
     def get_run_info(self, settlement_month: str) -> str:
         safe_month = self._normalize_month(settlement_month)
         run = db.get_latest_run_for_month(self.conn, safe_month)
-        return json.dumps({"ok": True, "run": asdict(run) if run else None}, ensure_ascii=False)
+        return _dumps({"ok": True, "run": run})
 
     @Slot(result=str)
     def backup(self) -> str:
         path = create_backup()
-        return json.dumps({"ok": True, "path": str(path)})
+        return _dumps({"ok": True, "path": str(path)})
 
     @Slot(str, result=str)
     def restore(self, mode: str) -> str:
         path, _ = QFileDialog.getOpenFileName(None, "", "", "Backup (*.zip)")
         if not path:
-            return json.dumps({"ok": False})
+            return _dumps({"ok": False})
         added, skipped = restore_backup(Path(path), mode)
-        return json.dumps({"ok": True, "added": added, "skipped": skipped})
-
-    def _special_list(self, settlement_month: str) -> Dict:
-        settlement_date = parse_settlement_month(settlement_month)
+        self._data_changed(students=True)
+        return _dumps({"ok": True, "added": added, "skipped": skipped})
+
+    def _data_changed(self, students: bool = False) -> None:
+        self._state_version += 1
+        self._state_cache = None
+        if students:
+            self._students_version += 1
+            self._students_cache = None
+
+    def _students_snapshot(self) -> Tuple[List[db.StudentRow], str, str]:
+        # Student rows plus their encoded list and status counts, rebuilt only after a student write.
+        cached = self._students_cache
+        if cached is not None and cached[0] == self._students_version:
+            return cached[1], cached[2], cached[3]
         students = db.list_students(self.conn)
-        cfg = db.get_latest_config(self.conn)
+        students_json = _dumps([self._student_to_dict(s) for s in students])
+        counts_json = _dumps(db.student_counts(self.conn))
+        self._students_cache = (self._students_version, students, students_json, counts_json)
+        return students, students_json, counts_json
+
+    def _special_list(
+        self,
+        settlement_month: str,
+        students: List[db.StudentRow] | None = None,
+        cfg: db.ConfigRow | None = None,
+    ) -> Dict:
+        # Callers that already hold the student list or config pass them in to skip the reads.
+        settlement_date = parse_settlement_month(settlement_month)
+        if students is None:
+            students = self._students_snapshot()[0]
+        if cfg is None:
+            cfg = db.get_latest_config(self.conn)
         baggage = []
         withdrawal = []
+        paid = db.baggage_paid_ids(self.conn)
+        default_checked = bool(cfg.withdrawn_living_default)
         for s in students:
-            if s.status == Status.GRADUATED and s.graduation_date and not db.is_baggage_paid(self.conn, s.student_id):
+            if s.status == Status.GRADUATED and s.graduation_date and s.student_id not in paid:
                 baggage.append(self._student_to_dict(s))
             if s.status == Status.WITHDRAWN and s.withdrawal_date:
                 if same_month(s.withdrawal_date, settlement_date):
                     item = self._student_to_dict(s)
-                    item["default_checked"] = bool(cfg.withdrawn_living_default)
+                    item["default_checked"] = default_checked
                     withdrawal.append(item)
         return {"baggage": baggage, "withdrawal": withdrawal}
 
@@ -352,54 +458,59 @@ class Backend(QObject):
         return home
 
     def _normalize_month(self, value: str) -> str:
-        if value:
-            try:
-                parse_settlement_month(value)
-                return value
-            except Exception:
-                pass
-        settings = load_settings()
-        saved = settings.get("settlement_month")
-        if saved:
-            try:
-                parse_settlement_month(saved)
-                return saved
-            except Exception:
-                pass
+        for candidate in (value, self.settings.get("settlement_month")):
+            if candidate and self._is_valid_month(candidate):
+                return candidate
         return date.today().strftime("%Y-%m")
 
+    def _is_valid_month(self, value: str) -> bool:
+        # Slots re-validate the same one or two month strings on every call.
+        if value in self._valid_months:
+            return True
+        try:
+            parse_settlement_month(value)
+        except Exception:
+            return False
+        if len(self._valid_months) >= 64:
+            self._valid_months.clear()
+        self._valid_months.add(value)
+        return True
+
     def _student_to_dict(self, student: db.StudentRow) -> Dict[str, str]:
+        graduation_date = student.graduation_date
+        withdrawal_date = student.withdrawal_date
         return {
             "student_id": student.student_id,
             "name": student.name,
-            "degree_level": student.degree_level.value,
+            "degree_level": _ENUM_VALUES[student.degree_level],
             "first_entry_date": student.first_entry_date.isoformat(),
-            "status": student.status.value,
-            "graduation_date": student.graduation_date.isoformat() if student.graduation_date else "",
-            "withdrawal_date": student.withdrawal_date.isoformat() if student.withdrawal_date else "",
+            "status": _ENUM_VALUES[student.status],
+            "graduation_date": graduation_date.isoformat() if graduation_date else "",
+            "withdrawal_date": withdrawal_date.isoformat() if withdrawal_date else "",
         }
 
     def _validate_student(self, data: Dict[str, str]) -> tuple[db.StudentRow | None, List[str], List[str]]:
+        t = self.translator.t
         errors: List[str] = []
         warnings: List[str] = []
 
         student_id = (data.get("student_id") or "").strip()
         name = (data.get("name") or "").strip()
         if not student_id:
-            errors.append(f"{self.translator.t('error.required')} ({self.translator.t('field.student_id')})")
+            errors.append(f"{t('error.required')} ({t('field.student_id')})")
         if not name:
-            errors.append(f"{self.translator.t('error.required')} ({self.translator.t('field.name')})")
+            errors.append(f"{t('error.required')} ({t('field.name')})")
 
         try:
             degree_level = DegreeLevel((data.get("degree_level") or "").strip())
         except Exception:
-            errors.append(f"{self.translator.t('error.required')} ({self.translator.t('field.degree')})")
+            errors.append(f"{t('error.required')} ({t('field.degree')})")
             degree_level = None
 
         try:
             status = Status((data.get("status") or "").strip())
         except Exception:
-            errors.append(f"{self.translator.t('error.required')} ({self.translator.t('field.status')})")
+            errors.append(f"{t('error.required')} ({t('field.status')})")
             status = None
 
         entry_raw = (data.get("first_entry_date") or "").strip()
@@ -408,9 +519,9 @@ class Backend(QObject):
             try:
                 entry_date = parse_date(entry_raw)
             except Exception:
-                errors.append(f"{self.translator.t('error.invalid_date')} ({self.translator.t('field.entry_date')})")
+                errors.append(f"{t('error.invalid_date')} ({t('field.entry_date')})")
         else:
-            errors.append(f"{self.translator.t('error.required')} ({self.translator.t('field.entry_date')})")
+            errors.append(f"{t('error.required')} ({t('field.entry_date')})")
 
         graduation_raw = (data.get("graduation_date") or "").strip()
         withdrawal_raw = (data.get("withdrawal_date") or "").strip()
@@ -422,34 +533,34 @@ class Backend(QObject):
                 graduation_date = parse_date(graduation_raw)
             except Exception:
                 errors.append(
-                    f"{self.translator.t('error.invalid_date')} ({self.translator.t('field.graduation_date')})"
+                    f"{t('error.invalid_date')} ({t('field.graduation_date')})"
                 )
         if withdrawal_raw:
             try:
                 withdrawal_date = parse_date(withdrawal_raw)
             except Exception:
                 errors.append(
-                    f"{self.translator.t('error.invalid_date')} ({self.translator.t('field.withdrawal_date')})"
+                    f"{t('error.invalid_date')} ({t('field.withdrawal_date')})"
                 )
 
         if status == Status.GRADUATED:
             if graduation_date is None:
-                errors.append(self.translator.t("error.graduation_required"))
+                errors.append(t("error.graduation_required"))
         elif status == Status.IN_STUDY:
             if graduation_date is not None:
-                warnings.append(self.translator.t("hint.graduation"))
+                warnings.append(t("hint.graduation"))
                 graduation_date = None
         elif status == Status.WITHDRAWN:
             if withdrawal_date is None:
-                errors.append(self.translator.t("error.withdrawal_required"))
+                errors.append(t("error.withdrawal_required"))
 
         if status != Status.WITHDRAWN:
             withdrawal_date = None
 
         if entry_date and graduation_date and graduation_date < entry_date:
-            errors.append(self.translator.t("error.entry_before_graduation"))
+            errors.append(t("error.entry_before_graduation"))
         if entry_date and withdrawal_date and withdrawal_date < entry_date:
-            errors.append(self.translator.t("error.entry_before_withdrawal"))
+            errors.append(t("error.entry_before_withdrawal"))
 
         if errors or degree_level is None or status is None or entry_date is None:
             return None, errors, warnings
@@ -466,21 +577,18 @@ class Backend(QObject):
         return student, errors, warnings
 
     def _per_student_totals(self, records: List[db.RecordRow], students: List[db.StudentRow]) -> List[Dict[str, str]]:
-        name_map = {s.student_id: s.name for s in students}
         totals: Dict[str, Decimal] = {}
         for r in records:
-            totals.setdefault(r.student_id, Decimal("0"))
-            totals[r.student_id] += Decimal(r.amount_cny)
-        result = []
-        for student_id, amount in totals.items():
-            result.append(
-                {
-                    "student_id": student_id,
-                    "name": name_map.get(student_id, ""),
-                    "amount_cny": str(amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)),
-                }
-            )
-        return result
+            totals[r.student_id] = totals.get(r.student_id, _D0) + Decimal(r.amount_cny)
+        name_map = {s.student_id: s.name for s in students if s.student_id in totals}
+        return [
+            {
+                "student_id": student_id,
+                "name": name_map.get(student_id, ""),
+                "amount_cny": str(amount.quantize(_CENTS, rounding=ROUND_HALF_UP)),
+            }
+            for student_id, amount in totals.items()
+        ]
 
 
 class WebApp(QWebEngineView):
@@ -493,7 +601,7 @@ class WebApp(QWebEngineView):
         self.translator.set_language(self.settings.get("language", "zh_CN"))
 
         self.channel = QWebChannel(self.page())
-        self.backend = Backend(self.translator, self.conn)
+        self.backend = Backend(self.translator, self.conn, self.settings)
         self.channel.registerObject("backend", self.backend)
         self.page().setWebChannel(self.channel)
 
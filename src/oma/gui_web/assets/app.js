@@ -465,7 +465,7 @@ function bindEvents() {
     const res = JSON.parse(await backend.import_students(text));
     if (!res.ok && res.errors) alert(res.errors.join("\n"));
     if (res.warnings && res.warnings.length) alert(res.warnings.join("\n"));
-    await loadState();
+    await refreshStudents();
   });
 
   document.getElementById("student-template").addEventListener("click", async () => {
@@ -489,7 +489,7 @@ function bindEvents() {
     if (!id) return;
     if (!confirm(t("confirm.delete"))) return;
     await backend.delete_student(id);
-    await loadState();
+    await refreshStudents();
   });
 
   document.getElementById("student-search").addEventListener("input", () => {
@@ -633,7 +633,7 @@ function bindEvents() {
     } else {
       document.getElementById("student-status").textContent = `${t("students.saved")} ${new Date().toLocaleString()}`;
     }
-    await loadState();
+    await refreshStudents();
   });
 
   document.getElementById("student-cancel").addEventListener("click", () => {
@@ -673,6 +673,20 @@ async function loadState() {
   renderRunHistory(state.runs || []);
 }
 
+async function refreshStudents() {
+  const section = JSON.parse(await backend.get_students_section());
+  state.students = section.students;
+  state.counts = section.counts;
+  state.special = section.special;
+  const names = {};
+  state.students.forEach(s => { names[s.student_id] = s.name; });
+  (state.per_student || []).forEach(r => { r.name = names[r.student_id] || ""; });
+  updateCounts(state.counts || {});
+  renderStudents(state.students || []);
+  renderSpecial(state.special || {baggage: [], withdrawal: []});
+  renderReports(state.records || [], state.per_student || []);
+}
+
 new QWebChannel(qt.webChannelTransport, function(channel) {
   backend = channel.objects.backend;
   bindEvents();
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from datetime import date
 from decimal import Decimal
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
+
+# dataclass(slots=True) needs Python 3.10; older interpreters keep a __dict__.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
 class DegreeLevel(str, Enum):
@@ -25,7 +29,7 @@ class AllowanceType(str, Enum):
     BAGGAGE = "ExcessBaggage"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class Student:
     student_id: str
     name: str
@@ -51,13 +55,13 @@ class Student:
         return self.graduation_date
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class MoneyAmount:
     usd: Decimal
     cny: Decimal
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class AllowanceRecord:
     student_id: str
     allowance_type: AllowanceType
@@ -66,10 +70,10 @@ class AllowanceRecord:
     amount: MoneyAmount
     rule_id: str
     description: str
-    metadata: Dict[str, str] = field(default_factory=dict)
+    metadata: Mapping[str, str] = field(default_factory=dict)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class CalculationResult:
     student_id: str
     records: List[AllowanceRecord]
@@ -80,7 +84,7 @@ class CalculationResult:
     warnings: List[str] = field(default_factory=list)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class AggregateRow:
     key: str
     totals_usd_by_type: Dict[AllowanceType, Decimal]
@@ -89,7 +93,7 @@ class AggregateRow:
     grand_total_cny: Decimal
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **_SLOTS)
 class ReportTables:
     per_student_records: List[Dict[str, str]]
     summary_by_student: List[Dict[str, str]]
@@ -1,83 +1,66 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import date
 from decimal import Decimal
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Tuple
 
 from .models import AllowanceRecord, AllowanceType, CalculationResult, ReportTables, Student
 
 
+# Column names per allowance type, shared by the student and year summaries.
+_TYPE_COLUMNS = [
+    (allowance_type, f"{allowance_type.value.lower()}_usd", f"{allowance_type.value.lower()}_cny")
+    for allowance_type in AllowanceType
+]
+_ZERO = Decimal("0")
+
+
 def build_report_tables(students: Iterable[Student], results: Iterable[CalculationResult]) -> ReportTables:
     student_lookup = {s.student_id: s for s in students}
     flat_records: List[Dict[str, str]] = []
-    summary_by_student: Dict[str, Dict[AllowanceType, Decimal]] = defaultdict(lambda: defaultdict(lambda: Decimal("0")))
-    summary_by_student_cny: Dict[str, Dict[AllowanceType, Decimal]] = defaultdict(lambda: defaultdict(lambda: Decimal("0")))
-    summary_by_year: Dict[str, Dict[AllowanceType, Decimal]] = defaultdict(lambda: defaultdict(lambda: Decimal("0")))
-    summary_by_year_cny: Dict[str, Dict[AllowanceType, Decimal]] = defaultdict(lambda: defaultdict(lambda: Decimal("0")))
-    summary_by_type: Dict[AllowanceType, Dict[str, Decimal]] = defaultdict(lambda: {"usd": Decimal("0"), "cny": Decimal("0")})
+    # Each bucket maps allowance type to a mutable [usd, cny] pair, so one lookup updates both currencies.
+    summary_by_student: Dict[str, Dict[AllowanceType, List[Decimal]]] = {}
+    summary_by_year: Dict[str, Dict[AllowanceType, List[Decimal]]] = {}
+    summary_by_type: Dict[AllowanceType, List[Decimal]] = {}
+    # Living records for the same month share a period, so its label and ISO dates are formatted once.
+    periods: Dict[Tuple[date, date, AllowanceType], Tuple[str, str, str]] = {}
 
     for result in results:
         for record in result.records:
             student = student_lookup.get(record.student_id)
-            student_name = student.name if student else ""
-            period_label = _format_period(record.period_start, record.period_end, record.allowance_type)
+            flat_records.append(_flat_record(record, student.name if student else "", periods))
+
+            allowance_type = record.allowance_type
             year_key = str(record.period_start.year)
+            usd = record.amount.usd
+            cny = record.amount.cny
 
-            flat_records.append(
-                {
-                    "student_id": record.student_id,
-                    "student_name": student_name,
-                    "allowance_type": record.allowance_type.value,
-                    "period": period_label,
-                    "period_start": record.period_start.isoformat(),
-                    "period_end": record.period_end.isoformat(),
-                    "amount_usd": str(record.amount.usd),
-                    "amount_cny": str(record.amount.cny),
-                    "rule_id": record.rule_id,
-                    "description": record.description,
-                    "metadata": "|".join(f"{k}={v}" for k, v in record.metadata.items()),
-                }
-            )
-
-            summary_by_student[record.student_id][record.allowance_type] += record.amount.usd
-            summary_by_student_cny[record.student_id][record.allowance_type] += record.amount.cny
-            summary_by_year[year_key][record.allowance_type] += record.amount.usd
-            summary_by_year_cny[year_key][record.allowance_type] += record.amount.cny
-            summary_by_type[record.allowance_type]["usd"] += record.amount.usd
-            summary_by_type[record.allowance_type]["cny"] += record.amount.cny
-
-    summary_student_rows: List[Dict[str, str]] = []
-    for student_id, totals in summary_by_student.items():
-        totals_cny = summary_by_student_cny[student_id]
-        row = {"student_id": student_id}
-        for allowance_type in AllowanceType:
-            row[f"{allowance_type.value.lower()}_usd"] = str(totals.get(allowance_type, Decimal("0")))
-            row[f"{allowance_type.value.lower()}_cny"] = str(totals_cny.get(allowance_type, Decimal("0")))
-        row["grand_total_usd"] = str(sum(totals.values(), Decimal("0")))
-        row["grand_total_cny"] = str(sum(totals_cny.values(), Decimal("0")))
-        summary_student_rows.append(row)
-
-    summary_year_rows: List[Dict[str, str]] = []
-    for year_key, totals in summary_by_year.items():
-        totals_cny = summary_by_year_cny[year_key]
-        row = {"year": year_key}
-        for allowance_type in AllowanceType:
-            row[f"{allowance_type.value.lower()}_usd"] = str(totals.get(allowance_type, Decimal("0")))
-            row[f"{allowance_type.value.lower()}_cny"] = str(totals_cny.get(allowance_type, Decimal("0")))
-        row["grand_total_usd"] = str(sum(totals.values(), Decimal("0")))
-        row["grand_total_cny"] = str(sum(totals_cny.values(), Decimal("0")))
-        summary_year_rows.append(row)
-
-    summary_type_rows: List[Dict[str, str]] = []
-    for allowance_type, totals in summary_by_type.items():
-        summary_type_rows.append(
-            {
-                "allowance_type": allowance_type.value,
-                "total_usd": str(totals["usd"]),
-                "total_cny": str(totals["cny"]),
-            }
-        )
+            student_totals = summary_by_student.get(record.student_id)
+            if student_totals is None:
+                student_totals = summary_by_student[record.student_id] = {}
+            year_totals = summary_by_year.get(year_key)
+            if year_totals is None:
+                year_totals = summary_by_year[year_key] = {}
+            for bucket in (student_totals, year_totals, summary_by_type):
+                pair = bucket.get(allowance_type)
+                if pair is None:
+                    bucket[allowance_type] = [usd, cny]
+                else:
+                    pair[0] += usd
+                    pair[1] += cny
+
+    summary_student_rows = [
+        _summary_row("student_id", student_id, totals) for student_id, totals in summary_by_student.items()
+    ]
+    summary_year_rows = [_summary_row("year", year_key, totals) for year_key, totals in summary_by_year.items()]
+    summary_type_rows: List[Dict[str, str]] = [
+        {
+            "allowance_type": allowance_type.value,
+            "total_usd": str(usd),
+            "total_cny": str(cny),
+        }
+        for allowance_type, (usd, cny) in summary_by_type.items()
+    ]
 
     return ReportTables(
         per_student_records=flat_records,
@@ -87,6 +70,46 @@ def build_report_tables(students: Iterable[Student], results: Iterable[Calculati
     )
 
 
+def _flat_record(
+    record: AllowanceRecord,
+    student_name: str,
+    periods: Dict[Tuple[date, date, AllowanceType], Tuple[str, str, str]],
+) -> Dict[str, str]:
+    key = (record.period_start, record.period_end, record.allowance_type)
+    period = periods.get(key)
+    if period is None:
+        period = periods[key] = (
+            _format_period(record.period_start, record.period_end, record.allowance_type),
+            record.period_start.isoformat(),
+            record.period_end.isoformat(),
+        )
+    metadata = record.metadata
+    return {
+        "student_id": record.student_id,
+        "student_name": student_name,
+        "allowance_type": record.allowance_type.value,
+        "period": period[0],
+        "period_start": period[1],
+        "period_end": period[2],
+        "amount_usd": str(record.amount.usd),
+        "amount_cny": str(record.amount.cny),
+        "rule_id": record.rule_id,
+        "description": record.description,
+        "metadata": "|".join(f"{k}={v}" for k, v in metadata.items()) if metadata else "",
+    }
+
+
+def _summary_row(label_key: str, label: str, totals: Dict[AllowanceType, List[Decimal]]) -> Dict[str, str]:
+    row = {label_key: label}
+    for allowance_type, usd_column, cny_column in _TYPE_COLUMNS:
+        pair = totals.get(allowance_type)
+        row[usd_column] = str(pair[0]) if pair else "0"
+        row[cny_column] = str(pair[1]) if pair else "0"
+    row["grand_total_usd"] = str(sum((pair[0] for pair in totals.values()), _ZERO))
+    row["grand_total_cny"] = str(sum((pair[1] for pair in totals.values()), _ZERO))
+    return row
+
+
 def _format_period(start: date, end: date, allowance_type: AllowanceType) -> str:
     if allowance_type == AllowanceType.LIVING:
         return start.strftime("%Y-%m")
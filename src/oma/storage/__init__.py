@@ -8,6 +8,7 @@ from .db import (
     list_students,
     get_student,
     upsert_student,
+    upsert_students,
     delete_student,
     get_latest_config,
     save_config,
@@ -15,10 +16,13 @@ from .db import (
     get_latest_run,
     get_latest_run_for_month,
     save_records,
+    save_settlement,
     fetch_records_for_run,
     fetch_records_for_month,
     is_baggage_paid,
+    baggage_paid_ids,
     record_baggage_paid,
+    record_baggage_paid_many,
 )
 
 __all__ = [
@@ -31,6 +35,7 @@ __all__ = [
     "list_students",
     "get_student",
     "upsert_student",
+    "upsert_students",
     "delete_student",
     "get_latest_config",
     "save_config",
@@ -38,8 +43,11 @@ __all__ = [
     "get_latest_run",
     "get_latest_run_for_month",
     "save_records",
+    "save_settlement",
     "fetch_records_for_run",
     "fetch_records_for_month",
     "is_baggage_paid",
+    "baggage_paid_ids",
     "record_baggage_paid",
+    "record_baggage_paid_many",
 ]
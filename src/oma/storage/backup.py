@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import io
 import json
 import shutil
 import sqlite3
@@ -12,6 +13,11 @@ from typing import Dict, List, Tuple
 from . import db
 from .paths import backup_dir, db_path
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 
 def create_backup() -> Path:
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
@@ -27,14 +33,25 @@ def create_backup() -> Path:
         conn.close()
 
     with zipfile.ZipFile(backup_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("students.json", json.dumps(students, ensure_ascii=True, indent=2, default=str))
-        zf.writestr("config_versions.json", json.dumps([config], ensure_ascii=True, indent=2))
-        zf.writestr("runs.json", json.dumps(runs, ensure_ascii=True, indent=2))
-        zf.writestr("allowance_records.json", json.dumps(records, ensure_ascii=True, indent=2))
-        zf.writestr("metadata.json", json.dumps(metadata, ensure_ascii=True, indent=2))
+        _write_json(zf, "students.json", students)
+        _write_json(zf, "config_versions.json", [config])
+        _write_json(zf, "runs.json", runs)
+        _write_json(zf, "allowance_records.json", records)
+        _write_json(zf, "metadata.json", metadata)
     return backup_path
 
 
+def _write_json(zf: zipfile.ZipFile, name: str, payload) -> None:
+    # Compact UTF-8 from either encoder; restore_backup decodes entries as UTF-8.
+    with zf.open(name, "w", force_zip64=True) as raw:
+        if orjson is not None:
+            raw.write(orjson.dumps(payload, default=str))
+            return
+        # The stdlib encoder streams into the compressed entry instead of building one string.
+        with io.TextIOWrapper(raw, encoding="utf-8") as fp:
+            json.dump(payload, fp, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
 def restore_backup(path: Path, mode: str) -> Tuple[int, int]:
     # returns (students_added, students_skipped)
     pre_backup = create_backup()
@@ -42,149 +59,141 @@ def restore_backup(path: Path, mode: str) -> Tuple[int, int]:
         raise ValueError("Invalid restore mode")
 
     with zipfile.ZipFile(path, "r") as zf:
-        students = json.loads(zf.read("students.json").decode("utf-8"))
-        configs = json.loads(zf.read("config_versions.json").decode("utf-8"))
-        runs = json.loads(zf.read("runs.json").decode("utf-8"))
-        records = json.loads(zf.read("allowance_records.json").decode("utf-8"))
-
-    conn = db.connect()
-    try:
-        if mode == "replace":
-            conn.executescript(
-                """
-                DELETE FROM allowance_records;
-                DELETE FROM settlement_runs;
-                DELETE FROM baggage_payments;
-                DELETE FROM students;
-                DELETE FROM configs;
-                """
-            )
+        conn = db.connect()
+        try:
+            # Each mode is one transaction: a failed restore leaves the database as it was.
+            # Entries are parsed one at a time, so only one table's rows are held in memory.
+            if mode == "replace":
+                for table in ("allowance_records", "settlement_runs", "baggage_payments", "students", "configs"):
+                    conn.execute(f"DELETE FROM {table}")
+                for name, sql, to_params in (
+                    ("config_versions.json", _INSERT_CONFIG_SQL, _config_params),
+                    ("runs.json", _INSERT_RUN_SQL, _run_params),
+                    ("allowance_records.json", _INSERT_RECORD_SQL, _record_params),
+                ):
+                    conn.executemany(sql, map(to_params, _read_json(zf, name)))
+                students = _read_json(zf, "students.json")
+                conn.executemany(_INSERT_STUDENT_SQL, map(_student_params, students))
+                conn.commit()
+                return len(students), 0
+
+            # merge
+            students = _read_json(zf, "students.json")
+            existing = {row[0] for row in conn.execute("SELECT student_id FROM students")}
+            payload = []
+            for s in students:
+                if s["student_id"] in existing:
+                    continue
+                existing.add(s["student_id"])
+                payload.append(_student_params(s))
+            conn.executemany(_INSERT_STUDENT_SQL, payload)
             conn.commit()
+            return len(payload), len(students) - len(payload)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
 
-            for cfg in configs:
-                _insert_config(conn, cfg)
-            for run in runs:
-                _insert_run(conn, run)
-            for record in records:
-                _insert_record(conn, record)
 
-            added = 0
-            for s in students:
-                if _insert_student(conn, s):
-                    added += 1
-            conn.commit()
-            return added, 0
-
-        # merge
-        added = 0
-        skipped = 0
-        for s in students:
-            if _insert_student(conn, s, skip_if_exists=True):
-                added += 1
-            else:
-                skipped += 1
-        conn.commit()
-        return added, skipped
-    finally:
-        conn.close()
+def _read_json(zf: zipfile.ZipFile, name: str):
+    # json.load takes the entry's bytes directly, skipping a decoded str copy of the whole document.
+    with zf.open(name) as fp:
+        return json.load(fp)
 
 
 def _fetch_all(conn: sqlite3.Connection, query: str) -> List[Dict]:
-    cur = conn.execute(query)
-    return [dict(row) for row in cur.fetchall()]
-
-
-def _insert_student(conn: sqlite3.Connection, s: Dict, skip_if_exists: bool = False) -> bool:
-    if skip_if_exists:
-        cur = conn.execute("SELECT 1 FROM students WHERE student_id = ?", (s["student_id"],))
-        if cur.fetchone() is not None:
-            return False
-    conn.execute(
-        """
-        INSERT OR REPLACE INTO students (student_id, name, degree_level, first_entry_date, status, graduation_date, withdrawal_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            s["student_id"],
-            s["name"],
-            s["degree_level"],
-            s["first_entry_date"],
-            s.get("status"),
-            s.get("graduation_date"),
-            s.get("withdrawal_date"),
-        ),
+    # Plain tuples zipped with the column names once are cheaper than dict(sqlite3.Row) per row.
+    cur = conn.cursor()
+    cur.row_factory = None
+    rows = cur.execute(query).fetchall()
+    columns = [description[0] for description in cur.description]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+_INSERT_STUDENT_SQL = """
+    INSERT OR REPLACE INTO students (student_id, name, degree_level, first_entry_date, status, graduation_date, withdrawal_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_CONFIG_SQL = """
+    INSERT INTO configs (
+        version, updated_at, living_allowance_bachelor, living_allowance_master, living_allowance_phd,
+        study_allowance_usd, baggage_allowance_usd, study_allowance_month, issue_study_if_entry_month,
+        issue_study_if_exit_before_oct_entry_year, withdrawn_living_default, fx_rate_usd_to_cny,
+        usd_quantize, cny_quantize, rounding_mode, rounding_policy
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_RUN_SQL = """
+    INSERT INTO settlement_runs (run_id, created_at, config_version, settlement_month, fx_rate)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_INSERT_RECORD_SQL = """
+    INSERT INTO allowance_records (
+        record_id, run_id, settlement_month, student_id, allowance_type, period_start, period_end,
+        amount_usd, amount_cny, fx_rate, rule_id, description, metadata_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _student_params(s: Dict) -> Tuple:
+    return (
+        s["student_id"],
+        s["name"],
+        s["degree_level"],
+        s["first_entry_date"],
+        s.get("status"),
+        s.get("graduation_date"),
+        s.get("withdrawal_date"),
     )
-    return True
-
-
-def _insert_config(conn: sqlite3.Connection, cfg: Dict) -> None:
-    conn.execute(
-        """
-        INSERT INTO configs (
-            version, updated_at, living_allowance_bachelor, living_allowance_master, living_allowance_phd,
-            study_allowance_usd, baggage_allowance_usd, study_allowance_month, issue_study_if_entry_month,
-            issue_study_if_exit_before_oct_entry_year, withdrawn_living_default, fx_rate_usd_to_cny,
-            usd_quantize, cny_quantize, rounding_mode, rounding_policy
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            cfg["version"],
-            cfg["updated_at"],
-            cfg["living_allowance_bachelor"],
-            cfg["living_allowance_master"],
-            cfg["living_allowance_phd"],
-            cfg["study_allowance_usd"],
-            cfg["baggage_allowance_usd"],
-            cfg.get("study_allowance_month", 10),
-            cfg.get("issue_study_if_entry_month", 0),
-            cfg["issue_study_if_exit_before_oct_entry_year"],
-            cfg.get("withdrawn_living_default", 0),
-            cfg["fx_rate_usd_to_cny"],
-            cfg["usd_quantize"],
-            cfg["cny_quantize"],
-            cfg["rounding_mode"],
-            cfg.get("rounding_policy", "final_only"),
-        ),
+
+
+def _config_params(cfg: Dict) -> Tuple:
+    return (
+        cfg["version"],
+        cfg["updated_at"],
+        cfg["living_allowance_bachelor"],
+        cfg["living_allowance_master"],
+        cfg["living_allowance_phd"],
+        cfg["study_allowance_usd"],
+        cfg["baggage_allowance_usd"],
+        cfg.get("study_allowance_month", 10),
+        cfg.get("issue_study_if_entry_month", 0),
+        cfg["issue_study_if_exit_before_oct_entry_year"],
+        cfg.get("withdrawn_living_default", 0),
+        cfg["fx_rate_usd_to_cny"],
+        cfg["usd_quantize"],
+        cfg["cny_quantize"],
+        cfg["rounding_mode"],
+        cfg.get("rounding_policy", "final_only"),
     )
 
 
-def _insert_run(conn: sqlite3.Connection, run: Dict) -> None:
-    conn.execute(
-        """
-        INSERT INTO settlement_runs (run_id, created_at, config_version, settlement_month, fx_rate)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (
-            run["run_id"],
-            run["created_at"],
-            run["config_version"],
-            run["settlement_month"],
-            run["fx_rate"],
-        ),
+def _run_params(run: Dict) -> Tuple:
+    return (
+        run["run_id"],
+        run["created_at"],
+        run["config_version"],
+        run["settlement_month"],
+        run["fx_rate"],
     )
 
 
-def _insert_record(conn: sqlite3.Connection, record: Dict) -> None:
-    conn.execute(
-        """
-        INSERT INTO allowance_records (
-            record_id, run_id, settlement_month, student_id, allowance_type, period_start, period_end,
-            amount_usd, amount_cny, fx_rate, rule_id, description, metadata_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            record["record_id"],
-            record["run_id"],
-            record["settlement_month"],
-            record["student_id"],
-            record["allowance_type"],
-            record["period_start"],
-            record["period_end"],
-            record["amount_usd"],
-            record["amount_cny"],
-            record["fx_rate"],
-            record["rule_id"],
-            record["description"],
-            record["metadata_json"],
-        ),
+def _record_params(record: Dict) -> Tuple:
+    return (
+        record["record_id"],
+        record["run_id"],
+        record["settlement_month"],
+        record["student_id"],
+        record["allowance_type"],
+        record["period_start"],
+        record["period_end"],
+        record["amount_usd"],
+        record["amount_cny"],
+        record["fx_rate"],
+        record["rule_id"],
+        record["description"],
+        record["metadata_json"],
     )
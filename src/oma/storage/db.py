@@ -2,10 +2,10 @@ from __future__ import annotations
 
 import json
 import sqlite3
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from ..config import AllowanceConfig
 from ..models import AllowanceRecord, AllowanceType, DegreeLevel, Status
@@ -69,9 +69,23 @@ class RecordRow:
     metadata_json: str
 
 
+# Explicit column lists keep SELECT order equal to field order, so rows unpack positionally.
+_STUDENT_COLUMNS = ", ".join(f.name for f in fields(StudentRow))
+_RUN_COLUMNS = ", ".join(f.name for f in fields(RunRow))
+_RECORD_COLUMNS = ", ".join(f.name for f in fields(RecordRow))
+_DEGREE_LEVELS = {member.value: member for member in DegreeLevel}
+_STATUSES = {member.value: member for member in Status}
+
+
 def connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path())
+    conn = sqlite3.connect(db_path(), cached_statements=256)
     conn.row_factory = sqlite3.Row
+    # WAL lets readers (exports, backups) proceed while a settlement run is being written.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
     return conn
 
 
@@ -140,6 +154,11 @@ def init_db(conn: sqlite3.Connection) -> None:
             settlement_month TEXT NOT NULL,
             FOREIGN KEY(run_id) REFERENCES settlement_runs(run_id)
         );
+
+        CREATE INDEX IF NOT EXISTS idx_records_run ON allowance_records(run_id, student_id, period_start);
+        CREATE INDEX IF NOT EXISTS idx_records_month ON allowance_records(settlement_month, student_id, period_start);
+        CREATE INDEX IF NOT EXISTS idx_records_type_student ON allowance_records(allowance_type, student_id);
+        CREATE INDEX IF NOT EXISTS idx_runs_month ON settlement_runs(settlement_month, run_id);
         """
     )
     conn.commit()
@@ -259,42 +278,57 @@ def list_students(conn: sqlite3.Connection, query: str = "", status: str = "", d
         clauses.append("degree_level = ?")
         params.append(degree)
     where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
-    cur = conn.execute(f"SELECT * FROM students {where_sql} ORDER BY student_id", params)
+    cur = conn.execute(f"SELECT {_STUDENT_COLUMNS} FROM students {where_sql} ORDER BY student_id", params)
     return [_row_to_student(row) for row in cur.fetchall()]
 
 
 def get_student(conn: sqlite3.Connection, student_id: str) -> Optional[StudentRow]:
-    cur = conn.execute("SELECT * FROM students WHERE student_id = ?", (student_id,))
+    cur = conn.execute(f"SELECT {_STUDENT_COLUMNS} FROM students WHERE student_id = ?", (student_id,))
     row = cur.fetchone()
     if not row:
         return None
     return _row_to_student(row)
 
 
-def upsert_student(conn: sqlite3.Connection, student: StudentRow) -> None:
-    conn.execute(
-        """
-        INSERT INTO students (
-            student_id, name, degree_level, first_entry_date, status, graduation_date, withdrawal_date
-        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(student_id) DO UPDATE SET
-            name = excluded.name,
-            degree_level = excluded.degree_level,
-            first_entry_date = excluded.first_entry_date,
-            status = excluded.status,
-            graduation_date = excluded.graduation_date,
-            withdrawal_date = excluded.withdrawal_date
-        """,
-        (
-            student.student_id,
-            student.name,
-            student.degree_level.value,
-            student.first_entry_date.isoformat(),
-            student.status.value,
-            student.graduation_date.isoformat() if student.graduation_date else None,
-            student.withdrawal_date.isoformat() if student.withdrawal_date else None,
-        ),
+_UPSERT_STUDENT_SQL = """
+    INSERT INTO students (
+        student_id, name, degree_level, first_entry_date, status, graduation_date, withdrawal_date
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(student_id) DO UPDATE SET
+        name = excluded.name,
+        degree_level = excluded.degree_level,
+        first_entry_date = excluded.first_entry_date,
+        status = excluded.status,
+        graduation_date = excluded.graduation_date,
+        withdrawal_date = excluded.withdrawal_date
+"""
+
+
+def _student_params(student: StudentRow) -> Tuple[Any, ...]:
+    return (
+        student.student_id,
+        student.name,
+        student.degree_level.value,
+        student.first_entry_date.isoformat(),
+        student.status.value,
+        student.graduation_date.isoformat() if student.graduation_date else None,
+        student.withdrawal_date.isoformat() if student.withdrawal_date else None,
     )
+
+
+def upsert_student(conn: sqlite3.Connection, student: StudentRow) -> None:
+    conn.execute(_UPSERT_STUDENT_SQL, _student_params(student))
+    conn.commit()
+
+
+def upsert_students(conn: sqlite3.Connection, students: Iterable[StudentRow]) -> None:
+    # One statement and one commit for a whole import; nothing is written if any row fails.
+    # Parameters are streamed to executemany, so no second list of tuples is built for large files.
+    try:
+        conn.executemany(_UPSERT_STUDENT_SQL, (_student_params(student) for student in students))
+    except Exception:
+        conn.rollback()
+        raise
     conn.commit()
 
 
@@ -313,45 +347,50 @@ def student_counts(conn: sqlite3.Connection) -> Dict[str, int]:
 
 
 def create_run(conn: sqlite3.Connection, config_version: int, settlement_month: str, fx_rate: Decimal) -> RunRow:
+    run_id = _insert_run(conn, config_version, settlement_month, fx_rate)
+    conn.commit()
+    return get_run(conn, run_id)
+
+
+def _insert_run(conn: sqlite3.Connection, config_version: int, settlement_month: str, fx_rate: Decimal) -> int:
     created_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
     cur = conn.execute(
         "INSERT INTO settlement_runs (created_at, config_version, settlement_month, fx_rate) VALUES (?, ?, ?, ?)",
         (created_at, config_version, settlement_month, str(fx_rate)),
     )
-    conn.commit()
-    return get_run(conn, cur.lastrowid)
+    return cur.lastrowid
 
 
 def get_run(conn: sqlite3.Connection, run_id: int) -> RunRow:
-    cur = conn.execute("SELECT * FROM settlement_runs WHERE run_id = ?", (run_id,))
+    cur = conn.execute(f"SELECT {_RUN_COLUMNS} FROM settlement_runs WHERE run_id = ?", (run_id,))
     row = cur.fetchone()
     if not row:
         raise RuntimeError("Run not found")
-    return RunRow(**dict(row))
+    return RunRow(*row)
 
 
 def get_latest_run(conn: sqlite3.Connection) -> Optional[RunRow]:
-    cur = conn.execute("SELECT * FROM settlement_runs ORDER BY run_id DESC LIMIT 1")
+    cur = conn.execute(f"SELECT {_RUN_COLUMNS} FROM settlement_runs ORDER BY run_id DESC LIMIT 1")
     row = cur.fetchone()
     if not row:
         return None
-    return RunRow(**dict(row))
+    return RunRow(*row)
 
 
 def get_latest_run_for_month(conn: sqlite3.Connection, settlement_month: str) -> Optional[RunRow]:
     cur = conn.execute(
-        "SELECT * FROM settlement_runs WHERE settlement_month = ? ORDER BY run_id DESC LIMIT 1",
+        f"SELECT {_RUN_COLUMNS} FROM settlement_runs WHERE settlement_month = ? ORDER BY run_id DESC LIMIT 1",
         (settlement_month,),
     )
     row = cur.fetchone()
     if not row:
         return None
-    return RunRow(**dict(row))
+    return RunRow(*row)
 
 
 def list_runs(conn: sqlite3.Connection) -> List[RunRow]:
-    cur = conn.execute("SELECT * FROM settlement_runs ORDER BY run_id DESC")
-    return [RunRow(**dict(row)) for row in cur.fetchall()]
+    cur = conn.execute(f"SELECT {_RUN_COLUMNS} FROM settlement_runs ORDER BY run_id DESC")
+    return [RunRow(*row) for row in cur.fetchall()]
 
 
 def delete_run(conn: sqlite3.Connection, run_id: int) -> None:
@@ -362,6 +401,33 @@ def delete_run(conn: sqlite3.Connection, run_id: int) -> None:
 
 
 def save_records(conn: sqlite3.Connection, run_id: int, settlement_month: str, records: Iterable[AllowanceRecord], fx_rate: Decimal) -> None:
+    _insert_records(conn, run_id, settlement_month, records, fx_rate)
+    conn.commit()
+
+
+def save_settlement(
+    conn: sqlite3.Connection, config_version: int, settlement_month: str, records: List[AllowanceRecord], fx_rate: Decimal
+) -> RunRow:
+    # The run, its records and the baggage payments they imply land in one transaction.
+    try:
+        run_id = _insert_run(conn, config_version, settlement_month, fx_rate)
+        _insert_records(conn, run_id, settlement_month, records, fx_rate)
+        _insert_baggage_paid(
+            conn,
+            [r.student_id for r in records if r.allowance_type == AllowanceType.BAGGAGE],
+            run_id,
+            settlement_month,
+        )
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return get_run(conn, run_id)
+
+
+def _insert_records(
+    conn: sqlite3.Connection, run_id: int, settlement_month: str, records: Iterable[AllowanceRecord], fx_rate: Decimal
+) -> None:
     payload = [
         (
             run_id,
@@ -375,7 +441,7 @@ def save_records(conn: sqlite3.Connection, run_id: int, settlement_month: str, r
             str(fx_rate),
             record.rule_id,
             record.description,
-            json.dumps(record.metadata, ensure_ascii=True),
+            json.dumps(record.metadata, ensure_ascii=True, default=dict),
         )
         for record in records
     ]
@@ -388,23 +454,22 @@ def save_records(conn: sqlite3.Connection, run_id: int, settlement_month: str, r
         """,
         payload,
     )
-    conn.commit()
 
 
 def fetch_records_for_run(conn: sqlite3.Connection, run_id: int) -> List[RecordRow]:
     cur = conn.execute(
-        "SELECT * FROM allowance_records WHERE run_id = ? ORDER BY student_id, period_start",
+        f"SELECT {_RECORD_COLUMNS} FROM allowance_records WHERE run_id = ? ORDER BY student_id, period_start",
         (run_id,),
     )
-    return [RecordRow(**dict(row)) for row in cur.fetchall()]
+    return [RecordRow(*row) for row in cur.fetchall()]
 
 
 def fetch_records_for_month(conn: sqlite3.Connection, settlement_month: str) -> List[RecordRow]:
     cur = conn.execute(
-        "SELECT * FROM allowance_records WHERE settlement_month = ? ORDER BY student_id, period_start",
+        f"SELECT {_RECORD_COLUMNS} FROM allowance_records WHERE settlement_month = ? ORDER BY student_id, period_start",
         (settlement_month,),
     )
-    return [RecordRow(**dict(row)) for row in cur.fetchall()]
+    return [RecordRow(*row) for row in cur.fetchall()]
 
 
 def is_baggage_paid(conn: sqlite3.Connection, student_id: str) -> bool:
@@ -418,28 +483,61 @@ def is_baggage_paid(conn: sqlite3.Connection, student_id: str) -> bool:
     return cur.fetchone() is not None
 
 
+def baggage_paid_ids(conn: sqlite3.Connection) -> Set[str]:
+    # Set form of is_baggage_paid for screening many students with one query.
+    cur = conn.execute(
+        """
+        SELECT student_id FROM baggage_payments
+        UNION
+        SELECT student_id FROM allowance_records WHERE allowance_type = ?
+        """,
+        ("ExcessBaggage",),
+    )
+    return {row[0] for row in cur}
+
+
 def record_baggage_paid(conn: sqlite3.Connection, student_id: str, run_id: int, settlement_month: str) -> None:
+    record_baggage_paid_many(conn, [student_id], run_id, settlement_month)
+
+
+def record_baggage_paid_many(
+    conn: sqlite3.Connection, student_ids: Iterable[str], run_id: int, settlement_month: str
+) -> None:
+    _insert_baggage_paid(conn, student_ids, run_id, settlement_month)
+    conn.commit()
+
+
+def _insert_baggage_paid(
+    conn: sqlite3.Connection, student_ids: Iterable[str], run_id: int, settlement_month: str
+) -> None:
     paid_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
-    conn.execute(
+    conn.executemany(
         """
         INSERT INTO baggage_payments (student_id, paid_at, run_id, settlement_month)
         VALUES (?, ?, ?, ?)
         ON CONFLICT(student_id) DO NOTHING
         """,
-        (student_id, paid_at, run_id, settlement_month),
+        [(student_id, paid_at, run_id, settlement_month) for student_id in student_ids],
     )
-    conn.commit()
 
 
 def _row_to_student(row: sqlite3.Row) -> StudentRow:
-    grad_value = row["graduation_date"]
-    withdrawal_value = row["withdrawal_date"]
+    # Rows come from a _STUDENT_COLUMNS select, so they unpack in StudentRow field order.
+    student_id, name, degree_level, entry_value, status, grad_value, withdrawal_value = row
     return StudentRow(
-        student_id=row["student_id"],
-        name=row["name"],
-        degree_level=DegreeLevel(row["degree_level"]),
-        first_entry_date=datetime.fromisoformat(row["first_entry_date"]).date(),
-        status=Status(row["status"]),
-        graduation_date=datetime.fromisoformat(grad_value).date() if grad_value else None,
-        withdrawal_date=datetime.fromisoformat(withdrawal_value).date() if withdrawal_value else None,
+        student_id=student_id,
+        name=name,
+        degree_level=_DEGREE_LEVELS[degree_level],
+        first_entry_date=_stored_date(entry_value),
+        status=_STATUSES[status],
+        graduation_date=_stored_date(grad_value) if grad_value else None,
+        withdrawal_date=_stored_date(withdrawal_value) if withdrawal_value else None,
     )
+
+
+def _stored_date(value: str) -> date:
+    # Dates are stored with date.isoformat(); a value with a time part falls back to datetime.
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value).date()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from calendar import monthrange
+from functools import lru_cache
 from datetime import date
 from decimal import Decimal, getcontext
 from typing import Iterable, Tuple
@@ -14,24 +15,27 @@ def month_start(d: date) -> date:
 
 
 def month_end(d: date) -> date:
-    last_day = monthrange(d.year, d.month)[1]
-    return date(d.year, d.month, last_day)
+    return date(d.year, d.month, _days_in(d.year, d.month))
 
 
 def iter_month_starts(start: date, end: date) -> Iterable[date]:
-    cur = date(start.year, start.month, 1)
-    while cur <= end:
-        yield cur
-        if cur.month == 12:
-            cur = date(cur.year + 1, 1, 1)
-        else:
-            cur = date(cur.year, cur.month + 1, 1)
+    # Months are counted as year * 12 + month - 1, so stepping is a plain range with no year-rollover branch.
+    for index in range(start.year * 12 + start.month - 1, end.year * 12 + end.month):
+        year, month = divmod(index, 12)
+        yield date(year, month + 1, 1)
 
 
 def days_in_month(d: date) -> int:
-    return monthrange(d.year, d.month)[1]
+    return _days_in(d.year, d.month)
 
 
+@lru_cache(maxsize=512)
+def _days_in(year: int, month: int) -> int:
+    return monthrange(year, month)[1]
+
+
+# Entry dates repeat across a cohort; Decimal results are immutable, so sharing is safe.
+@lru_cache(maxsize=2048)
 def proration_fraction(entry_date: date) -> Decimal:
     total_days = days_in_month(entry_date)
     days = total_days - entry_date.day + 1
@@ -30,6 +30,8 @@ TEMPLATES = Jinja2Templates(directory=str((BASE_DIR / "templates").resolve()))
 DEFAULT_LANG = "zh_CN"
 SUPPORTED_LANGS = {"zh_CN", "en_US"}
 TRANSLATIONS: Dict[str, Dict[str, str]] = {}
+_D0 = Decimal("0")
+_CENTS = Decimal("0.01")
 
 
 app = FastAPI(title="Oman Students Allowance Calculator")
@@ -769,7 +771,7 @@ def reports(
         totals_cny = sum(Decimal(row["amount_cny"]) for row in records)
         per_student_totals: Dict[str, Decimal] = {}
         for row in records:
-            per_student_totals[row["student_id"]] = per_student_totals.get(row["student_id"], Decimal("0")) + Decimal(
+            per_student_totals[row["student_id"]] = per_student_totals.get(row["student_id"], _D0) + Decimal(
                 row["amount_cny"]
             )
     finally:
@@ -784,7 +786,7 @@ def reports(
             "year": year,
             "run_id": run_id,
             "settlement_month": settlement_month or (target_run.settlement_month if target_run else ""),
-            "totals_cny": str(quantize_amount(Decimal(totals_cny), Decimal("0.01"), "ROUND_HALF_UP"))
+            "totals_cny": str(quantize_amount(Decimal(totals_cny), _CENTS, "ROUND_HALF_UP"))
             if records
             else "0.00",
             "per_student_totals": per_student_totals,
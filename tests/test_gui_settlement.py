@@ -1,3 +1,6 @@
+import os
+import subprocess
+import sys
 import unittest
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
@@ -164,6 +167,11 @@ class GuiSettlementTests(unittest.TestCase):
         self.assertEqual(living[0].amount.usd, usd_raw)
         self.assertEqual(living[0].amount.cny, cny_q)
 
+    def test_settlement_import_does_not_load_qt(self):
+        code = "import sys, oma.gui.settlement; sys.exit(any(m.startswith('PySide6') for m in sys.modules))"
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from oma.config import AllowanceConfig
+from oma.models import AllowanceRecord, AllowanceType, DegreeLevel, MoneyAmount, Status
+from oma.storage import db
+from oma.storage.backup import create_backup, restore_backup
+
+
+class StorageBackupTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.environ["APPDATA"] = self.temp_dir.name
+        self.conn = db.connect()
+        db.init_db(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.temp_dir.cleanup()
+
+    def _student(self, student_id, name):
+        return db.StudentRow(
+            student_id=student_id,
+            name=name,
+            degree_level=DegreeLevel.BACHELOR,
+            first_entry_date=date(2024, 1, 1),
+            status=Status.IN_STUDY,
+            graduation_date=None,
+            withdrawal_date=None,
+        )
+
+    def _backup(self):
+        # restore_backup writes its own pre-restore backup, which can reuse a same-second file name.
+        return shutil.move(str(create_backup()), os.path.join(self.temp_dir.name, "saved.zip"))
+
+    def test_replace_restores_runs_and_records(self):
+        db.upsert_students(self.conn, [self._student("S1", "One"), self._student("S2", "Two")])
+        cfg = db.save_config(self.conn, AllowanceConfig.default(), withdrawn_living_default=False)
+        run = db.create_run(self.conn, cfg.version, "2024-02", Decimal("7.10"))
+        amount = MoneyAmount(usd=Decimal("100.00"), cny=Decimal("710.00"))
+        record = AllowanceRecord("S1", AllowanceType.LIVING, date(2024, 2, 1), date(2024, 2, 29), amount, "LIVING", "living")
+        db.save_records(self.conn, run.run_id, "2024-02", [record], Decimal("7.10"))
+        path = self._backup()
+
+        db.delete_student(self.conn, "S2")
+        db.delete_run(self.conn, run.run_id)
+        self.assertEqual(restore_backup(Path(path), "replace"), (2, 0))
+        self.assertEqual(len(db.list_students(self.conn)), 2)
+        self.assertEqual(len(db.fetch_records_for_run(self.conn, run.run_id)), 1)
+
+    def test_merge_skips_existing_students(self):
+        db.upsert_students(self.conn, [self._student("S1", "One"), self._student("S2", "Two")])
+        path = self._backup()
+
+        db.delete_student(self.conn, "S2")
+        db.upsert_student(self.conn, self._student("S1", "Renamed"))
+        self.assertEqual(restore_backup(Path(path), "merge"), (1, 1))
+        self.assertEqual(db.get_student(self.conn, "S1").name, "Renamed")
+        self.assertEqual(db.get_student(self.conn, "S2").name, "Two")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,9 +2,10 @@ import os
 import tempfile
 import unittest
 from datetime import date
+from decimal import Decimal
 
 from oma.storage import db
-from oma.models import DegreeLevel, Status
+from oma.models import AllowanceRecord, AllowanceType, DegreeLevel, MoneyAmount, Status
 from oma.storage.paths import app_data_dir
 
 
@@ -35,6 +36,53 @@ class StorageBaggageTests(unittest.TestCase):
         db.record_baggage_paid(self.conn, student.student_id, run.run_id, "2024-07")
         cur = self.conn.execute("SELECT COUNT(*) AS cnt FROM baggage_payments WHERE student_id = ?", (student.student_id,))
         self.assertEqual(cur.fetchone()["cnt"], 1)
+        self.assertEqual(db.baggage_paid_ids(self.conn), {student.student_id})
+
+    def test_upsert_students_batch_updates_existing(self):
+        first = db.StudentRow(
+            student_id="S2",
+            name="Before",
+            degree_level=DegreeLevel.MASTER,
+            first_entry_date=date(2024, 9, 1),
+            status=Status.IN_STUDY,
+            graduation_date=None,
+            withdrawal_date=None,
+        )
+        db.upsert_student(self.conn, first)
+        updated = db.StudentRow(
+            student_id="S2",
+            name="After",
+            degree_level=DegreeLevel.MASTER,
+            first_entry_date=date(2024, 9, 1),
+            status=Status.GRADUATED,
+            graduation_date=date(2026, 6, 30),
+            withdrawal_date=None,
+        )
+        added = db.StudentRow(
+            student_id="S3",
+            name="New",
+            degree_level=DegreeLevel.PHD,
+            first_entry_date=date(2025, 3, 1),
+            status=Status.IN_STUDY,
+            graduation_date=None,
+            withdrawal_date=None,
+        )
+        db.upsert_students(self.conn, [updated, added])
+        self.assertEqual(db.get_student(self.conn, "S2"), updated)
+        self.assertEqual(db.get_student(self.conn, "S3"), added)
+
+    def test_save_settlement_marks_baggage_with_records(self):
+        amount = MoneyAmount(usd=Decimal("100.00"), cny=Decimal("710.00"))
+        records = [
+            AllowanceRecord("S4", AllowanceType.LIVING, date(2024, 7, 1), date(2024, 7, 31), amount, "LIVING", "living"),
+            AllowanceRecord("S5", AllowanceType.BAGGAGE, date(2024, 7, 1), date(2024, 7, 1), amount, "BAGGAGE", "baggage"),
+        ]
+        run = db.save_settlement(self.conn, 1, "2024-07", records, Decimal("7.10"))
+        self.assertEqual(run.settlement_month, "2024-07")
+        self.assertEqual(len(db.fetch_records_for_run(self.conn, run.run_id)), 2)
+        self.assertEqual(db.baggage_paid_ids(self.conn), {"S5"})
+        cur = self.conn.execute("SELECT COUNT(*) AS cnt FROM baggage_payments")
+        self.assertEqual(cur.fetchone()["cnt"], 1)
 
 
 if __name__ == "__main__":